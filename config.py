@@ -7,8 +7,26 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parent
 
 # --- SETTINGS FOR RAW DATA INGESTION ---
-# The specific file where raw data lives
+# Partitioned Parquet store (country/year) where raw data lives
+RAW_STORE_DIR = PROJECT_ROOT / "data" / "01_raw" / "generation"
+# Legacy single-file raw data, only read by the store migration (src/storage/raw_store.py)
 DATA_FILE_RAW = PROJECT_ROOT / "data" / "01_raw" / "generation_2024_raw.csv"
+# Last ingested timestamp per (country, PSR type), used by incremental ingestion
+INGEST_STATE_FILE = PROJECT_ROOT / "data" / "01_raw" / "ingest_state.json"
+# Fetch strategy (bulk/targeted) and available PSR types learned per country
+INGEST_STRATEGY_FILE = PROJECT_ROOT / "data" / "01_raw" / "ingest_strategies.json"
+# Content-addressed cache of raw ENTSO-E responses (offline replay for CI/benchmarks)
+ENTSOE_CACHE_DIR = PROJECT_ROOT / "data" / "01_raw" / "entsoe_cache"
+# Wide memory-mapped matrix of all processed lightweight series (src/storage/series_matrix.py)
+SERIES_MATRIX_DIR = PROJECT_ROOT / "data" / "02_processed" / "lightweight" / "series_matrix"
+# Cached XGBoost feature matrices, keyed by raw data hash, target and feature spec version
+FEATURE_STORE_DIR = PROJECT_ROOT / "data" / "02_processed" / "feature_store"
+# Online lag/rolling state per (country, target), advanced hour by hour (src/training_phase/feature_spec.py)
+FEATURE_STATE_FILE = PROJECT_ROOT / "data" / "02_processed" / "feature_state.json"
+# Machine-readable result of the raw data quality gates (src/training_phase/validate_data.py)
+VALIDATION_REPORT_FILE = PROJECT_ROOT / "data" / "04_metrics" / "validation_report.json"
+# Finished download windows are checkpointed here so an interrupted run can resume
+INGEST_CHECKPOINT_DIR = PROJECT_ROOT / "data" / "01_raw" / "checkpoints"
 
 # Target countries for raw data ingestion from ENTSOE platform
 TARGET_COUNTRIES = [
@@ -20,14 +38,23 @@ TARGET_COLS = ["Solar", "Wind Onshore", "Wind Offshore"]
 START_DATE = "2024-01-01"
 END_DATE = "2025-01-01"
 
+# ENTSO-E allows 400 requests per minute per API key; stay safely below that
+ENTSOE_REQUESTS_PER_MINUTE = 300
+ENTSOE_MAX_WORKERS = 4
+ENTSOE_MAX_RETRIES = 3
+# Size of a single download window (pandas offset alias, "MS" = one calendar month)
+INGEST_WINDOW_FREQ = "MS"
+
 # --- GLOBAL SETTINGS ---
 TARGET_COUNTRY = "AT"
 
 
 # --- 🔴 FIX IS HERE 🔴 ---
-# Point to the specific subfolder where the .pkl files are.
+# Point to the specific subfolder where the hw_*.json model artifacts are.
 # If your folder is named "holt_winters", change "lightweight" to "holt_winters".
 MODEL_DIR = PROJECT_ROOT / "models" / "lightweight" 
+# All Holt-Winters models packed into one memory-mapped file for serving (src/storage/hw_bundle.py)
+HW_BUNDLE_FILE = MODEL_DIR / "hw_bundle.bin"
 MODEL_DIR_XGB = PROJECT_ROOT / "models"
 CARBON_DIR = PROJECT_ROOT / "data" / "05_carbon"
 OUTPUT_DIR = PROJECT_ROOT / "data" / "03_forecasts"
@@ -1,12 +1,11 @@
 from src.training_phase.feature_engineering import build_features_dataframe
+from src.storage.raw_store import read_raw
 from pathlib import Path
 import pandas as pd
 
 #PROJECT_ROOT = Path(__file__).resolve()#.parents[2]
 
-DATA_FILE = "data/01_raw/generation_2024_raw.csv"
-
-df = pd.read_csv(DATA_FILE)
+df = read_raw()
 TARGET_COL = "Wind Onshore" #, "Wind Offshore","Solar"]
 
 X,y,timestamp = build_features_dataframe(df=df, target_col=TARGET_COL)
@@ -20,7 +20,13 @@ def health():
     """Health check for Kubernetes"""
     if forecaster is None:
         raise HTTPException(status_code=503, detail="Forecaster not initialized")
-    return {"status": "healthy", "model": "Holt-Winters"}
+    try:
+        # Checks the model bundle's header and checksum without loading any model
+        bundle = forecaster.bundle_status()
+    except Exception as e:
+        logger.error(f"❌ Model bundle check failed: {e}")
+        raise HTTPException(status_code=503, detail=f"Model bundle corrupt: {e}")
+    return {"status": "healthy", "model": "Holt-Winters", **bundle}
 
 @app.get("/predict/{country_code}")
 def get_prediction(country_code: str):
@@ -59,12 +65,61 @@ def get_prediction(country_code: str):
         
     except HTTPException:
         raise
+    except ValueError as e:
+        # The requested day starts before the newest state of the models
+        logger.warning(f"⚠️ Rejected window for {country_code}: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Prediction failed for {country_code}: {e}")
         import traceback
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/predict_batch")
+def get_batch_prediction(countries: str = None):
+    """
+    Forecast several countries in one vectorized call
+    countries: comma-separated codes (e.g. "DE,FR,AT"), all target countries if omitted
+    Returns: {"data": {country: records}} in the per-country record format, plus the
+    countries without models under "missing"
+    """
+    if forecaster is None:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+
+    country_codes = [c.strip().upper() for c in countries.split(",") if c.strip()] if countries else None
+    logger.info(f"🌱 Holt-Winters batch prediction request for: {country_codes or 'all countries'}")
+
+    try:
+        result = forecaster.predict_batch(country_codes)
+        emissions = result["emissions_kg"]
+
+        data = {c: df.reset_index().to_dict(orient="records")
+                for c, df in result["forecast_data"].items() if not df.empty}
+        missing = [c for c, df in result["forecast_data"].items() if df.empty]
+        if not data:
+            raise HTTPException(status_code=404, detail=f"No forecast data available for countries: {missing}")
+
+        logger.info(f"✅ Generated forecasts for {len(data)} countries")
+        logger.info(f"🌱 Carbon footprint: {emissions:.10f} kg CO2")
+
+        return {
+            "model": "Holt-Winters",
+            "execution_carbon_kg": emissions,
+            "data": data,
+            "missing": missing
+        }
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.warning(f"⚠️ Rejected batch window: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Batch prediction failed: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Memory benchmark of the dense and compact feature matrices (feature_engineering.py)
+on synthetic multi-year data.
+
+For each mode it reports the build time, the peak memory allocated while building
+(tracemalloc, which also sees NumPy buffers) and the size of the resulting X,
+the matrix XGBoost trains on:
+
+    python src/benchmarks/bench_feature_memory.py --years 3
+"""
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.benchmarks.synthetic import synthetic_raw_frame
+from src.training_phase.feature_engineering import build_features_dataframe
+
+
+def _measure(df, target_col: str, compact: bool) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    X, y, _ = build_features_dataframe(df, target_col, save_csv=False, compact=compact)
+    seconds = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 2**20, "x_mb": X.memory_usage(deep=True).sum() / 2**20,
+            "columns": X.shape[1], "rows": len(X)}
+
+
+def main(years: int = 3, target_col: str = "Solar"):
+    df = synthetic_raw_frame(years)
+    print(f"📊 Synthetic raw data: {len(df):,} rows, {df['Country'].nunique()} countries, {years} years ({target_col})")
+
+    dense = _measure(df, target_col, compact=False)
+    compact = _measure(df, target_col, compact=True)
+
+    print(f"\n💾 Feature memory benchmark ({dense['rows']:,} feature rows)")
+    for name, result in [("dense", dense), ("compact", compact)]:
+        print(f"   {name:<8} {result['columns']:>3} columns | X {result['x_mb']:8.1f} MB | "
+              f"build peak {result['peak_mb']:8.1f} MB | {result['seconds']:.2f}s")
+    print(f"   X is {dense['x_mb'] / compact['x_mb']:.1f}x smaller, build peak "
+          f"{dense['peak_mb'] / compact['peak_mb']:.1f}x lower in compact mode")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dense vs compact feature memory")
+    parser.add_argument("--years", type=int, default=3, help="Years of synthetic hourly data per country")
+    parser.add_argument("--target", default="Solar", help="Target column the features are built for")
+    args = parser.parse_args()
+
+    main(years=args.years, target_col=args.target)
@@ -0,0 +1,97 @@
+"""
+Benchmark of the single-pass resample/gap-fill (build_hourly_matrix in
+data_preprocessing_lightweight.py) against the per-series loop it replaced, on
+synthetic data over a grid of country counts and history lengths.
+
+The loop masks the full raw frame once per (country, target) series, so its time
+grows with countries x targets x rows; the single pass touches every row once.
+Both produce the hourly, gap-filled series the CSVs are written from; they are
+compared before the times are reported (best of --repeat runs):
+
+    python src/benchmarks/bench_preprocessing.py --countries 4 12 28 --years 1 2
+"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import TARGET_COUNTRIES
+from src.benchmarks.synthetic import synthetic_raw_frame
+from src.training_phase.data_preprocessing_lightweight import TARGETS, build_hourly_matrix
+
+
+def per_series_loop(df: pd.DataFrame) -> dict:
+    """The former implementation: one Country mask + resample + interpolate per series."""
+    series = {}
+    for country in df["Country"].unique():
+        for target in TARGETS:
+            mask = (df["Country"] == country)
+            series_df = df.loc[mask, ["datetime_utc", target]].set_index("datetime_utc")
+            if series_df[target].isna().all() or series_df.empty:
+                continue
+            series_df = series_df.resample("h").mean()
+            series[(country, target)] = series_df[target].interpolate(method="linear").fillna(0.0)
+    return series
+
+
+def single_pass(df: pd.DataFrame) -> dict:
+    """build_hourly_matrix plus the per-series cut the CSV writer does."""
+    wide, spans, available = build_hourly_matrix(df)
+    series = {}
+    for country, span in spans.iterrows():
+        for target in TARGETS:
+            if available[(target, country)]:
+                series[(country, target)] = wide.loc[span["min"]:span["max"], (target, country)].fillna(0.0)
+    return series
+
+
+def _best_of(repeat: int, func) -> tuple:
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def _check_same(loop: dict, single: dict):
+    if loop.keys() != single.keys():
+        raise AssertionError(f"Series differ: {sorted(loop.keys() ^ single.keys())}")
+    for key, expected in loop.items():
+        actual = single[key]
+        if not expected.index.equals(actual.index):
+            raise AssertionError(f"{key}: hourly index differs")
+        np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-12, err_msg=str(key))
+
+
+def main(countries: list = (4, 12, 28), years: list = (1, 2), repeat: int = 3):
+    print(f"⏱️  Resample/gap-fill benchmark (best of {repeat}, {len(TARGETS)} targets per country)")
+    print(f"   {'countries':>9} {'years':>5} {'rows':>11} | {'per-series loop':>15} {'single pass':>11} "
+          f"{'speedup':>7} | {'ns/row (loop)':>13} {'ns/row (single)':>15}")
+    for n_countries in countries:
+        for n_years in years:
+            df = synthetic_raw_frame(n_years, countries=TARGET_COUNTRIES[:n_countries])
+            loop_seconds, loop = _best_of(repeat, lambda: per_series_loop(df))
+            single_seconds, single = _best_of(repeat, lambda: single_pass(df))
+            _check_same(loop, single)
+
+            print(f"   {n_countries:>9} {n_years:>5} {len(df):>11,} | {loop_seconds:>14.3f}s {single_seconds:>10.3f}s "
+                  f"{loop_seconds / single_seconds:>6.1f}x | {loop_seconds / len(df) * 1e9:>13.0f} "
+                  f"{single_seconds / len(df) * 1e9:>15.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the lightweight resample/gap-fill step")
+    parser.add_argument("--countries", type=int, nargs="+", default=[4, 12, 28],
+                        help=f"Country counts to benchmark (at most {len(TARGET_COUNTRIES)})")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 2], help="Years of synthetic hourly data per country")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one is reported")
+    args = parser.parse_args()
+
+    main(countries=args.countries, years=args.years, repeat=args.repeat)
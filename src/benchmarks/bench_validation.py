@@ -0,0 +1,59 @@
+"""
+Benchmark of the raw data quality gate (validate_data.py) on synthetic multi-year data.
+
+Reports the in-memory statistics pass (compute_series_stats) and the full gate
+(Parquet read, statistics, JSON report) on a temporary raw store, best of
+--repeat runs:
+
+    python src/benchmarks/bench_validation.py --years 3
+"""
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.benchmarks.synthetic import synthetic_raw_frame
+from src.storage.raw_store import write_partitions
+from src.training_phase.validate_data import compute_series_stats, validate_raw_store
+
+
+def _best_of(repeat: int, func) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main(years: int = 3, repeat: int = 3):
+    df = synthetic_raw_frame(years)
+    reference_time = df["datetime_utc"].max()
+    print(f"📊 Synthetic raw data: {len(df):,} rows, {df['Country'].nunique()} countries, {years} years")
+
+    stats_seconds = _best_of(repeat, lambda: compute_series_stats(df, reference_time))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "generation"
+        write_partitions(df, root, merge=False)
+        report_file = Path(tmp) / "validation_report.json"
+        gate_seconds = _best_of(repeat, lambda: validate_raw_store(root=root, reference_time=reference_time,
+                                                                   report_file=report_file, fail=False))
+
+    print(f"\n⏱️  Validation benchmark (best of {repeat})")
+    print(f"   Statistics pass: {stats_seconds:.3f}s ({len(df) / stats_seconds / 1e6:.1f}M rows/s)")
+    print(f"   Full gate (read + stats + report): {gate_seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the raw data quality gate")
+    parser.add_argument("--years", type=int, default=3, help="Years of synthetic hourly data per country")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one is reported")
+    args = parser.parse_args()
+
+    main(years=args.years, repeat=args.repeat)
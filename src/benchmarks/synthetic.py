@@ -0,0 +1,53 @@
+"""
+Synthetic multi-year raw generation data for the benchmarks in this package.
+
+The frame has the raw store schema (datetime_utc, Country, Solar, Wind Onshore,
+Wind Offshore), hourly rows for every country and a fixed seed, so runs are
+reproducible and need neither the ENTSO-E API nor the real data.
+"""
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import TARGET_COUNTRIES
+
+
+def synthetic_raw_frame(years: int = 3, countries: list = None, start: str = "2021-01-01",
+                        missing_ratio: float = 0.005, seed: int = 42) -> pd.DataFrame:
+    """
+    Hourly rows of `years` years per country: a daily solar curve with seasonal
+    amplitude, autocorrelated wind and no offshore wind for every second country.
+    A `missing_ratio` share of the values is NaN, like gaps in the API data.
+    """
+    countries = list(TARGET_COUNTRIES if countries is None else countries)
+    rng = np.random.default_rng(seed)
+    hours = pd.date_range(start, periods=int(years * 365.25 * 24), freq="h", tz="UTC")
+    n = len(hours)
+    hour_of_day = hours.hour.to_numpy()
+    day_of_year = hours.dayofyear.to_numpy()
+
+    blocks = []
+    for i, country in enumerate(countries):
+        scale = rng.uniform(500, 40_000)
+        season = 0.6 + 0.4 * np.cos((day_of_year - 172) / 365.25 * 2 * np.pi)
+        solar = np.maximum(np.sin((hour_of_day - 6) / 12 * np.pi), 0) * season * scale * rng.uniform(0.6, 1.0, n)
+        wind = np.abs(np.cumsum(rng.normal(0, 0.02, n)) % 1.0) * scale
+        offshore = wind * 0.3 if i % 2 == 0 else np.full(n, np.nan)
+
+        block = pd.DataFrame({
+            "datetime_utc": hours,
+            "Country": country,
+            "Solar": solar.round(1),
+            "Wind Onshore": wind.round(1),
+            "Wind Offshore": offshore.round(1),
+        })
+        for col in ["Solar", "Wind Onshore", "Wind Offshore"]:
+            block.loc[rng.random(n) < missing_ratio, col] = np.nan
+        blocks.append(block)
+
+    return pd.concat(blocks, ignore_index=True)
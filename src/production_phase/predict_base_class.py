@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 import pandas as pd
 from pathlib import Path
-from config import DATA_FILE_RAW
+from config import RAW_STORE_DIR
+from src.storage.raw_store import read_raw, list_countries
 
 class BaseForecaster(ABC):
     """
@@ -9,16 +10,22 @@ class BaseForecaster(ABC):
     Enforces a consistent interface for the Orchestrator to use.
     """
     def __init__(self):
-        self.data_path = DATA_FILE_RAW
-        self._raw_data = None
+        self.data_path = RAW_STORE_DIR
+        self._raw_data = {}
 
-    def _get_data(self) -> pd.DataFrame:
-        """Shared internal method to load data safely."""
-        if self._raw_data is None:
+    def _get_data(self, country_code: str) -> pd.DataFrame:
+        """
+        Shared internal method to load data safely.
+        Only the requested country's partitions are read (and cached), so load
+        time and memory don't depend on how many countries are in the store.
+        """
+        if country_code not in self._raw_data:
             if not self.data_path.exists():
-                raise FileNotFoundError(f"Data file not found at {self.data_path}")
-            self._raw_data = pd.read_csv(self.data_path)
-        return self._raw_data
+                raise FileNotFoundError(f"Data store not found at {self.data_path}")
+            if country_code not in list_countries(self.data_path):
+                return pd.DataFrame()
+            self._raw_data[country_code] = read_raw(countries=[country_code], root=self.data_path)
+        return self._raw_data[country_code]
 
     @abstractmethod
     def predict(self, country_code: str) -> pd.DataFrame:
@@ -1,5 +1,5 @@
-import joblib
 import warnings
+import numpy as np
 import pandas as pd
 import sys
 from pathlib import Path
@@ -10,40 +10,75 @@ from codecarbon import EmissionsTracker
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(PROJECT_ROOT))
 from src.production_phase.predict_base_class import BaseForecaster
-from config import TARGET_COLS, MODEL_DIR, OUTPUT_DIR
+from src.storage.hw_artifact import HWBatch, HWStates, artifact_name, load_hw_artifact
+from src.storage.hw_bundle import HWBundle
+from config import TARGET_COLS, TARGET_COUNTRIES, MODEL_DIR, HW_BUNDLE_FILE, OUTPUT_DIR
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
 class HoltWintersForecaster(BaseForecaster):
     """
-    Holt-Winters implementation that loads pre-trained pkl models.
+    Holt-Winters implementation that serves pre-trained models from the memory-mapped
+    bundle (HW_BUNDLE_FILE), or from the hw_*.json artifacts if no bundle was built.
     Refactored to follow the Class-based Architectural Design.
     """
     def __init__(self):
         super().__init__()
-        # Note: We use MODEL_DIR from config for the .pkl files
+        # Opened lazily on the first request; its pages are shared by all worker processes
+        self.bundle = HWBundle(HW_BUNDLE_FILE)
+        self._use_bundle = False
+        # Note: Without a bundle we use MODEL_DIR from config for the hw_*.json artifacts
+        # (country, target) -> (artifact mtime, HWStates); re-read only when retrained
+        self._models = {}
+        # Models of the last batch and their stacked states (see predict_batch)
+        self._batch = ((), None)
+
+    def _refresh_models(self):
+        """Once per request: pick up a new or replaced bundle (one stat call)."""
+        self._use_bundle = self.bundle.refresh()
+
+    def bundle_status(self) -> dict:
+        """Integrity of the bundle (see HWBundle.verify); raises if it is corrupt."""
+        if not self.bundle.refresh():
+            return {"bundle": "absent", "fallback": "json artifacts"}
+        return {"bundle": "ok", **self.bundle.verify()}
 
     def _load_model(self, country: str, target: str):
-        """Internal helper to load specific country/target pkl files."""
-        clean_target = target.replace(' ', '_')
-        filename = f"hw_{country}_{clean_target}.pkl"
-        model_path = MODEL_DIR / filename
-        
-        if not model_path.exists():
+        """Internal helper returning the cached NumPy forecaster of a country/target (see src/storage/hw_bundle.py)."""
+        if self._use_bundle:
+            try:
+                return self.bundle.get(country, target)
+            except Exception as e:
+                print(f"Error loading model {country}/{target} from bundle: {e}")
+                return None
+
+        key = (country, target)
+        try:
+            mtime = (MODEL_DIR / artifact_name(country, target)).stat().st_mtime_ns
+        except FileNotFoundError:
+            self._models.pop(key, None)
             return None
+
+        cached = self._models.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
         try:
-            return joblib.load(model_path)
+            model = HWStates.from_artifact(load_hw_artifact(country, target, MODEL_DIR))
         except Exception as e:
-            print(f"Error loading {filename}: {e}")
+            print(f"Error loading model {country}/{target}: {e}")
             return None
+        self._models[key] = (mtime, model)
+        return model
 
     def predict(self, country_code: str, forecast_date = None) -> dict:
         """
         Generates a standard 24h profile (Midnight to Midnight) for the current date.
+        Raises ValueError if the states were already updated past that midnight (see _offsets).
         Returns the DataFrame for the API/Orchestrator to use.
         """
         print(f"\n🔮 Generating Daily Forecast for {country_code} (Lightweight)...")
+        self._refresh_models()
         
         # Define "Today" from 00:00 to 23:00 UTC
         # Unified date logic (same as XGBoost + your function)
@@ -60,39 +95,42 @@ class HoltWintersForecaster(BaseForecaster):
             real_start = pd.Timestamp.now(tz="UTC").normalize()
         else:
             real_start = pd.Timestamp(forecast_date, tz="UTC").normalize()
+
+        models = {}
+        for target in TARGET_COLS:
+            model = self._load_model(country_code, target)
+            if model is not None:
+                models[target.replace(' ', '_')] = model
+
+        try:
+            offsets = self._offsets(real_start, list(models.values()))
+        except ValueError:
+            tracker.stop()
+            raise
         future_index = pd.date_range(start=real_start, periods=24, freq="h")
         
         forecasts = {}
         
-        for target in TARGET_COLS:
-            model = self._load_model(country_code, target)
-            
-            if model is None:
-                continue
-                
-            clean_target = target.replace(' ', '_')
-                
+        for (clean_target, model), offset in zip(models.items(), offsets):
             try:
-                # Get the model's raw 24-hour pattern
-                raw_values = model.forecast(24).values
-                
+                # Get the model's raw 24-hour pattern (closed form from the stored states,
+                # `offset` hours after the last observation folded into them)
                 # Physics Check (No negative energy)
-                raw_values[raw_values < 0] = 0
+                raw_values = np.maximum(model.forecast(24, offset), 0.0)
                 
-                # Map directly to 00:00 - 23:00
-                forecast_series = pd.Series(data=raw_values, index=future_index)
-                forecasts[clean_target] = forecast_series
+                # Mapped directly to the window's 24 hours when the frame is assembled
+                forecasts[clean_target] = raw_values
                 
-                print(f"   ✅ {clean_target:<15} | Peak: {forecast_series.max():,.0f} MW")
+                print(f"   ✅ {clean_target:<15} | Peak: {raw_values.max():,.0f} MW")
                 
             except Exception as e:
-                print(f"   ❌ Failed to predict {target}: {e}")
+                print(f"   ❌ Failed to predict {clean_target}: {e}")
 
         
         emissions_kg = tracker.stop()
         # Final Assembly
         if forecasts:
-            result_df = pd.DataFrame(forecasts)
+            result_df = pd.DataFrame(forecasts, index=future_index)
             result_df["Total_Generation"] = result_df.sum(axis=1)
             result_df.index.name = "datetime_utc"
             
@@ -116,6 +154,97 @@ class HoltWintersForecaster(BaseForecaster):
                 "emissions_kg": 0.0               # Zero emissions
             }
 
+    @staticmethod
+    def _offsets(real_start: pd.Timestamp, models: list) -> list:
+        """
+        Each model's horizon (hours after its last state) of the 24h window starting at
+        real_start (midnight), so forecasts continue from the latest observation folded
+        into the states instead of the end of the training data.
+
+        A window starting at or before a model's last state cannot be forecast from it;
+        that raises ValueError rather than shifting the window off midnight.
+        """
+        hour = pd.Timedelta(hours=1)
+        offsets = [1 if m.last_time is None else (real_start - m.last_time) // hour for m in models]
+        if any(offset < 1 for offset in offsets):
+            latest = max(m.last_time for m in models if m.last_time is not None)
+            raise ValueError(f"Window {real_start} starts before the models' last state ({latest}), "
+                             f"only windows from {(latest + hour).ceil('D')} on can be forecast")
+        return offsets
+
+    def _stacked(self, models: list) -> HWBatch:
+        """HWBatch of the models, reused while none of them was reloaded."""
+        cached_models, batch = self._batch
+        if batch is None or len(cached_models) != len(models) or any(a is not b for a, b in zip(cached_models, models)):
+            batch = HWBatch(models)
+            self._batch = (tuple(models), batch)
+        return batch
+
+    def predict_batch(self, country_codes: list = None, forecast_date = None) -> dict:
+        """
+        Same 24h forecasts as predict(), for several countries (default: TARGET_COUNTRIES)
+        at once: the states of every requested series are stacked and forecast in one
+        vectorized call. forecast_data maps each country to a frame shaped like predict()'s
+        (empty when it has no models). Raises ValueError like predict().
+        """
+        countries = list(TARGET_COUNTRIES if country_codes is None else country_codes)
+        print(f"\n🔮 Generating Daily Forecast for {len(countries)} countries (Lightweight, batched)...")
+        self._refresh_models()
+
+        tracker = EmissionsTracker(
+            project_name="renewable_energy_forecast",
+            measure_power_secs=1,
+            save_to_file=False,
+            logging_logger=None  # Suppress logs
+        )
+        tracker.start()
+
+        if forecast_date is None:
+            real_start = pd.Timestamp.now(tz="UTC").normalize()
+        else:
+            real_start = pd.Timestamp(forecast_date, tz="UTC").normalize()
+
+        future_index = pd.date_range(start=real_start, periods=24, freq="h", name="datetime_utc")
+        keys, models, offsets = [], [], []
+        for country_code in countries:
+            country_models = {}
+            for target in TARGET_COLS:
+                model = self._load_model(country_code, target)
+                if model is not None:
+                    country_models[target.replace(' ', '_')] = model
+
+            try:
+                country_offsets = self._offsets(real_start, list(country_models.values()))
+            except ValueError:
+                tracker.stop()
+                raise
+            keys += [(country_code, clean_target) for clean_target in country_models]
+            models += country_models.values()
+            offsets += country_offsets
+
+        # Physics Check (No negative energy)
+        values = np.maximum(self._stacked(models).forecast(24, np.array(offsets)), 0.0) if models else np.empty((0, 24))
+
+        per_country = {country_code: {} for country_code in countries}
+        for (country_code, clean_target), row in zip(keys, values):
+            per_country[country_code][clean_target] = row
+
+        forecast_data = {}
+        for country_code, forecasts in per_country.items():
+            if forecasts:
+                # Totals summed in NumPy, one frame constructor per country is all the pandas work
+                forecasts["Total_Generation"] = np.sum(list(forecasts.values()), axis=0)
+                forecast_data[country_code] = pd.DataFrame(forecasts, index=future_index)
+            else:
+                forecast_data[country_code] = pd.DataFrame()
+
+        emissions_kg = tracker.stop()
+        print(f"   ✅ {len(models)} series of {sum(bool(f) for f in per_country.values())}/{len(countries)} countries forecast")
+        return {
+            "forecast_data": forecast_data,
+            "emissions_kg": emissions_kg
+        }
+
 # ==========================================
 # EXAMPLE USAGE
 # ==========================================
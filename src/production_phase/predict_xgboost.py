@@ -9,7 +9,8 @@ from codecarbon import EmissionsTracker
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(PROJECT_ROOT))
 from src.production_phase.predict_base_class import BaseForecaster
-from config import TARGET_COLS, MODEL_DIR_XGB, OUTPUT_DIR
+from src.training_phase.feature_spec import FEATURE_SPEC, country_categorical, load_feature_states, serving_window
+from config import TARGET_COLS, MODEL_DIR_XGB, OUTPUT_DIR, FEATURE_STATE_FILE
 
 warnings.filterwarnings("ignore")
 
@@ -18,47 +19,29 @@ class XGBoostForecaster(BaseForecaster):
         super().__init__()
         # We don't load the model in __init__ because we have multiple models 
         # (one for Solar, one for Wind, etc.)
+        # Online feature states kept at the hour before today's lookup window by feature_engineering --refresh-state
+        self._feature_states = {}
+        self._feature_states_mtime = None
+
+    def _get_feature_states(self) -> dict:
+        """Persisted feature states, re-read whenever the refresh job has rewritten the file."""
+        mtime = FEATURE_STATE_FILE.stat().st_mtime if FEATURE_STATE_FILE.exists() else None
+        if mtime != self._feature_states_mtime:
+            self._feature_states = load_feature_states(FEATURE_STATE_FILE)
+            self._feature_states_mtime = mtime
+        return self._feature_states
 
     # --- YOUR HELPER FUNCTIONS BECOME INTERNAL METHODS ---
-    def _add_time_features(self, df):
-        df["hour"] = df.index.hour
-        df["dayofweek"] = df.index.dayofweek
-        df["month"] = df.index.month
-        df["dayofyear"] = df.index.dayofyear
-        df["weekofyear"] = df.index.isocalendar().week.astype(int)
-        df["is_weekend"] = df["dayofweek"].isin([5, 6]).astype(int)
-        return df
-
-    def _get_prediction_row(self, history_df, target_col, real_dt, lookup_dt, country_code, feature_names):
-        # Features from REAL DATE (2025)
-        row_df = pd.DataFrame(index=[real_dt])
-        row_df = self._add_time_features(row_df)
-        # 2. Lags from LOOKUP DATE (2024)
-        lags = [1, 3, 6, 12, 24, 48, 168]
-        for lag in lags:
-            lag_lookup_time = lookup_dt - pd.Timedelta(hours=lag)
-            
-            # Robust Lookup
-            if lag_lookup_time in history_df.index:
-                val = history_df.loc[lag_lookup_time, target_col]
-                if isinstance(val, pd.Series): val = val.iloc[0] # Handle duplicates
-            else:
-                val = 0
-                
-            row_df[f"{target_col}_lag_{lag}"] = val
-
-        # 3. Rolling Stats
-        for window in [24, 168]:
-            window_data = history_df[target_col].loc[:lookup_dt].tail(window)
-            
-            if len(window_data) > 0:
-                row_df[f"{target_col}_roll_mean_{window}"] = window_data.mean()
-                row_df[f"{target_col}_roll_std_{window}"] = window_data.std()
-            else:
-                row_df[f"{target_col}_roll_mean_{window}"] = 0
-                row_df[f"{target_col}_roll_std_{window}"] = 0
-
-        # 4. Country One-Hot
+    # Calendar, lag and rolling features come from the shared FeatureSpec (same kernels as training)
+    def _get_prediction_row(self, calendar_row, lag_rolling, target_col, country_code, feature_names):
+        # 1. Features from REAL DATE (2025)
+        row_df = calendar_row.copy()
+        # 2./3. Lags + Rolling Stats from LOOKUP DATE (2024), incl. earlier predictions
+        row_df[FEATURE_SPEC.lag_rolling_columns(target_col)] = lag_rolling[None, :]
+
+        # 4. Country: one categorical column (compact models) or One-Hot
+        if "country" in feature_names:
+            row_df["country"] = country_categorical([country_code])
         for col in feature_names:
             if col.startswith("country_"):
                 country_suffix = col.replace("country_", "")
@@ -84,11 +67,8 @@ class XGBoostForecaster(BaseForecaster):
         tracker.start()
         
         # 1. Load Data (Using the inherited method from BaseForecaster)
-        full_df = self._get_data() 
-        full_df["datetime_utc"] = pd.to_datetime(full_df["datetime_utc"], utc=True)
-        full_df = full_df.drop_duplicates(subset=["datetime_utc", "Country"], keep="last")
-        
-        country_history = full_df[full_df["Country"] == country_code].copy()
+        # The raw store keeps (datetime_utc, Country) unique, so no de-duplication is needed here
+        country_history = self._get_data(country_code)
         if country_history.empty:
             return {
                 "forecast data": pd.DataFrame(),  # Empty DataFrame
@@ -98,15 +78,12 @@ class XGBoostForecaster(BaseForecaster):
         country_history = country_history.set_index("datetime_utc").sort_index()
         
         # 2. Setup Dates (Unified forecast_date logic)
-        if forecast_date is None:
-            real_start = pd.Timestamp.now(tz="UTC").normalize()
-        else:
-            real_start = pd.Timestamp(forecast_date, tz="UTC").normalize()
+        real_start, lookup_start = serving_window(forecast_date)
         real_steps = pd.date_range(start=real_start, periods=24, freq="h")
-        lookup_start = real_start - pd.DateOffset(years=1)
         lookup_steps = pd.date_range(start=lookup_start, periods=24, freq="h")
 
         forecasts = {}
+        feature_states = self._get_feature_states()
 
         for target in TARGET_COLS:
             clean_target = target.replace(' ', '_')
@@ -117,16 +94,22 @@ class XGBoostForecaster(BaseForecaster):
             model = joblib.load(model_path)
             feature_names = model.get_booster().feature_names
             
-            temp_history = country_history[[target]].copy()
+            # The refreshed state is used when it ends right before the lookup window,
+            # otherwise (other forecast dates, stale file) it is built from the history before it
+            state = feature_states.get((country_code, target))
+            if state is not None and state.last_time != lookup_start - pd.Timedelta(hours=1):
+                state = None
+            plan = FEATURE_SPEC.step_plan(country_history[target], lookup_steps[0], len(lookup_steps), state)
+            calendar = FEATURE_SPEC.calendar_features(real_steps).set_index(real_steps)
             predictions = []
 
-            for real_dt, lookup_dt in zip(real_steps, lookup_steps):
+            for i in range(len(real_steps)):
                 X_step = self._get_prediction_row(
-                    temp_history, target, real_dt, lookup_dt, country_code, feature_names
+                    calendar.iloc[[i]], plan.features(i), target, country_code, feature_names
                 )
                 pred = model.predict(X_step)[0]
                 pred = max(0, float(pred))
-                temp_history.loc[lookup_dt, target] = pred
+                plan.update(i, pred)
                 predictions.append(pred)
 
             forecasts[clean_target] = predictions
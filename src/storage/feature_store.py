@@ -0,0 +1,126 @@
+"""
+On-disk cache of XGBoost feature matrices.
+
+Layout:  <root>/features_<Target>_<dense|compact>_<key>.parquet
+
+The key hashes (raw data fingerprint, target, feature spec version, compact), so
+an entry is only reused when the raw data and the feature code are unchanged.
+Each file holds X plus the target ("__y__") and timestamp ("__ts__") columns;
+Parquet keeps the float32/int8/categorical dtypes of the compact mode intact.
+Saving an entry evicts every other entry of the same target and mode.
+Large entries can be written chunk by chunk with FeatureStore.writer() and read
+back the same way with FeatureStore.iter_chunks().
+"""
+import os
+import sys
+import hashlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import FEATURE_STORE_DIR
+
+Y_COL = "__y__"
+TS_COL = "__ts__"
+
+
+class FeatureStore:
+    def __init__(self, root: Path = FEATURE_STORE_DIR):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(raw_hash: str, target: str, spec_version: int, compact: bool) -> str:
+        payload = f"{raw_hash}|{target}|{spec_version}|{int(compact)}"
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def _prefix(self, target: str, compact: bool) -> str:
+        return f"features_{target.replace(' ', '_')}_{'compact' if compact else 'dense'}_"
+
+    def _path(self, target: str, compact: bool, key: str) -> Path:
+        return self.root / f"{self._prefix(target, compact)}{key}.parquet"
+
+    def contains(self, target: str, compact: bool, key: str) -> bool:
+        return self._path(target, compact, key).exists()
+
+    def load(self, target: str, compact: bool, key: str) -> tuple | None:
+        """(X, y, timestamps) of a matching entry, or None on a miss."""
+        path = self._path(target, compact, key)
+        if not path.exists():
+            return None
+
+        df = pd.read_parquet(path)
+        y = df.pop(Y_COL).rename(target)
+        timestamps = df.pop(TS_COL).rename("datetime_utc")
+        return df, y, timestamps
+
+    def iter_chunks(self, target: str, compact: bool, key: str):
+        """(X, y, timestamps) of an existing entry, one Parquet row group at a time."""
+        with pq.ParquetFile(self._path(target, compact, key)) as parquet:
+            for i in range(parquet.num_row_groups):
+                df = parquet.read_row_group(i).to_pandas()
+                y = df.pop(Y_COL).rename(target)
+                timestamps = df.pop(TS_COL).rename("datetime_utc")
+                yield df, y, timestamps
+
+    def save(self, target: str, compact: bool, key: str, X: pd.DataFrame, y: pd.Series, timestamps: pd.Series) -> Path:
+        """Write an entry (atomically) and evict the stale ones it replaces."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(target, compact, key)
+
+        df = X.assign(**{Y_COL: y, TS_COL: timestamps})
+        tmp = path.with_suffix(".tmp")
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+        self._evict(target, compact, keep=path)
+        return path
+
+    def writer(self, target: str, compact: bool, key: str) -> "FeatureStoreWriter":
+        """Incremental writer for an entry built chunk by chunk (see FeatureStoreWriter)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        return FeatureStoreWriter(self, target, compact, self._path(target, compact, key))
+
+    def _evict(self, target: str, compact: bool, keep: Path):
+        for stale in self.root.glob(f"{self._prefix(target, compact)}*.parquet"):
+            if stale != keep:
+                stale.unlink()
+                print(f"   🧹 Evicted stale features: {stale.name}")
+
+
+class FeatureStoreWriter:
+    """
+    Appends feature chunks to one entry as Parquet row groups, so only the current
+    chunk is ever in memory. The entry becomes visible (and stale ones are evicted)
+    on close(); abort() discards it. All chunks must share one schema (compact mode).
+    """
+
+    def __init__(self, store: FeatureStore, target: str, compact: bool, path: Path):
+        self.store, self.target, self.compact, self.path = store, target, compact, path
+        self.tmp = path.with_suffix(".tmp")
+        self.rows = 0
+        self._writer = None
+
+    def append(self, X: pd.DataFrame, y: pd.Series, timestamps: pd.Series):
+        table = pa.Table.from_pandas(X.assign(**{Y_COL: y, TS_COL: timestamps}), preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.tmp, table.schema)
+        self._writer.write_table(table)
+        self.rows += len(table)
+
+    def close(self) -> Path:
+        if self._writer is None:
+            raise ValueError(f"No feature chunks written for {self.target}")
+        self._writer.close()
+        os.replace(self.tmp, self.path)
+        self.store._evict(self.target, self.compact, keep=self.path)
+        return self.path
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        self.tmp.unlink(missing_ok=True)
@@ -0,0 +1,278 @@
+"""
+Compact JSON artifacts of fitted Holt-Winters models.
+
+Layout:  <MODEL_DIR>/hw_<country>_<Target>.json
+
+An artifact keeps only what forecasting needs: the smoothing parameters, the
+final level and trend, the last 24 seasonal states and some metadata, a few KB
+instead of the ~1 MB pickled statsmodels results (which also carry the whole
+training series). Only additive seasonality with an optional additive (damped)
+trend is supported, which covers every model train_lightweight_model fits.
+
+Serving goes through HWStates, a closed-form NumPy forecaster over those states,
+so the HW service needs neither statsmodels nor pickles.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import MODEL_DIR
+
+ARTIFACT_VERSION = 1
+
+
+def artifact_name(country: str, target: str) -> str:
+    """e.g. 'hw_DE_Wind_Onshore.json' (same naming as the old .pkl files)."""
+    return f"hw_{country}_{target.replace(' ', '_')}.json"
+
+
+def _optional(value) -> float | None:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def export_hw_artifact(results, country: str, target: str) -> dict:
+    """Artifact of a fitted statsmodels HoltWintersResults (duck-typed, statsmodels is not imported)."""
+    model, params = results.model, results.params
+    trend = model.trend if model.has_trend else None
+    seasonal = model.seasonal if model.has_seasonal else None
+    m = int(model.seasonal_periods or 0)
+    if trend not in (None, "add") or seasonal != "add":
+        raise ValueError(f"Only additive Holt-Winters models can be exported (trend={trend}, seasonal={seasonal})")
+    if params.get("use_boxcox"):
+        raise ValueError("Box-Cox transformed models cannot be exported")
+
+    season = np.asarray(results.season, dtype=np.float64)
+    index = getattr(model, "_index", None)
+    return {
+        "version": ARTIFACT_VERSION,
+        "country": country,
+        "target": target.replace("_", " "),
+        "trend": trend,
+        "damped": bool(model.damped_trend),
+        "seasonal": seasonal,
+        "seasonal_periods": m,
+        "params": {
+            "alpha": float(params["smoothing_level"]),
+            "beta": _optional(params.get("smoothing_trend")),
+            "gamma": float(params["smoothing_seasonal"]),
+            "phi": _optional(params.get("damping_trend")),
+        },
+        "level": float(np.asarray(results.level)[-1]),
+        "slope": float(np.asarray(results.trend)[-1]) if trend else 0.0,
+        # Seasonal states of the last m hours, oldest first; season[k] belongs to hour T+1+k.
+        # statsmodels' forecast uses the state one period older than season[-1] for hour T+m,
+        # so that one is kept as well to reproduce its forecasts exactly.
+        "season": season[-m:].tolist(),
+        "season_prev": float(season[-m - 1]),
+        "nobs": int(model.nobs),
+        "last_timestamp": pd.Timestamp(index[-1]).isoformat() if isinstance(index, pd.DatetimeIndex) else None,
+    }
+
+
+def save_hw_artifact(artifact: dict, root: Path = MODEL_DIR) -> Path:
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / artifact_name(artifact["country"], artifact["target"])
+
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(artifact, indent=2))
+    os.replace(tmp, path)
+    return path
+
+
+def load_hw_artifact(country: str, target: str, root: Path = MODEL_DIR) -> dict | None:
+    """The artifact of one series, or None if it was never trained."""
+    path = Path(root) / artifact_name(country, target)
+    if not path.exists():
+        return None
+
+    artifact = json.loads(path.read_text())
+    if artifact.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported Holt-Winters artifact version in {path.name}: {artifact.get('version')}")
+    return artifact
+
+
+def load_hw_artifacts(root: Path = MODEL_DIR) -> list:
+    """Every artifact under root."""
+    artifacts = []
+    for path in sorted(Path(root).glob("hw_*.json")):
+        artifact = json.loads(path.read_text())
+        if artifact.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported Holt-Winters artifact version in {path.name}: {artifact.get('version')}")
+        artifacts.append(artifact)
+    return artifacts
+
+
+def trend_weights(phi: float | None, steps: int) -> np.ndarray:
+    """Trend multipliers of hours 1..steps: phi + phi^2 + ... + phi^h if damped, else h."""
+    h = np.arange(1, steps + 1, dtype=np.float64)
+    return h if phi is None else np.cumsum(phi ** h)
+
+
+def _trend_weights_at(phi, h: np.ndarray) -> np.ndarray:
+    """trend_weights() at arbitrary horizons h, via the geometric sum (phi is NaN when undamped)."""
+    phi = np.asarray(phi, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        damped = phi * (1.0 - phi ** h) / (1.0 - phi)
+    return np.where(np.isnan(phi) | (phi == 1.0), h, damped)
+
+
+class HWStates:
+    """
+    Closed-form additive Holt-Winters forecaster over the states of one artifact:
+
+        y(T+h) = level + w(h) * slope + profile[(h - 1) % m]
+
+    with w(h) from trend_weights() (slope is 0 without a trend), profile the
+    seasonal states of the next m hours and T the last hour folded into the states
+    (last_time). Weights are cached per horizon, so a 24h forecast is two small
+    NumPy operations.
+    """
+    __slots__ = ("level", "slope", "phi", "profile", "last_time", "_weights")
+
+    def __init__(self, level: float, slope: float, phi: float | None, profile: np.ndarray, last_time: pd.Timestamp | None = None):
+        self.level, self.slope, self.phi = level, slope, phi
+        self.profile = np.asarray(profile, dtype=np.float64)
+        self.last_time = last_time
+        self._weights = {}
+
+    @classmethod
+    def from_artifact(cls, artifact: dict) -> "HWStates":
+        damped = artifact["trend"] and artifact["damped"]
+        profile = artifact["season"][:-1] + [artifact["season_prev"]]
+        last_time = pd.Timestamp(artifact["last_timestamp"]) if artifact.get("last_timestamp") else None
+        return cls(artifact["level"], artifact["slope"], artifact["params"]["phi"] if damped else None, profile, last_time)
+
+    def forecast(self, steps: int = 24, start: int = 1) -> np.ndarray:
+        """Hours T+start .. T+start+steps-1."""
+        m = len(self.profile)
+        if start != 1:
+            h = np.arange(start, start + steps, dtype=np.float64)
+            trend = _trend_weights_at(np.nan if self.phi is None else self.phi, h) * self.slope
+            return self.level + trend + self.profile[np.arange(start - 1, start - 1 + steps) % m]
+
+        weights = self._weights.get(steps)
+        if weights is None:
+            weights = self._weights[steps] = trend_weights(self.phi, steps)
+        season = self.profile[:steps] if steps <= m else np.resize(self.profile, steps)
+        return self.level + weights * self.slope + season
+
+
+def hw_forecast(artifact: dict, steps: int = 24, start: int = 1) -> np.ndarray:
+    """Forecast of `steps` hours, starting `start` hours after the artifact's last hour."""
+    return HWStates.from_artifact(artifact).forecast(steps, start)
+
+
+def verify_hw_artifact(artifact: dict, reference: np.ndarray, rtol: float = 1e-9):
+    """Raise ValueError unless the artifact reproduces a reference (statsmodels) forecast."""
+    reference = np.asarray(reference, dtype=np.float64)
+    deviation = np.abs(hw_forecast(artifact, len(reference)) - reference).max()
+    tolerance = rtol * max(1.0, np.abs(reference).max())
+    if not deviation <= tolerance:
+        raise ValueError(f"Artifact forecast deviates from statsmodels by {deviation:.3g} (tolerance {tolerance:.3g})")
+
+
+def update_hw_artifact(artifact: dict, observations: pd.Series) -> int:
+    """
+    Fold new hourly observations into the artifact's states (in place), O(1) each.
+
+    Uses the fitted smoothing parameters and exactly the recursions statsmodels
+    fits with (beta smooths the level change directly, not beta* = beta / alpha):
+
+        l(t) = alpha * (y - s(t-m)) + (1 - alpha) * (l(t-1) + phi * b(t-1))
+        b(t) = beta * (l(t) - l(t-1)) + (1 - beta) * phi * b(t-1)
+        s(t) = gamma * (y - l(t-1) - phi * b(t-1)) + (1 - gamma) * s(t-m)
+
+    so folding data in gives the states statsmodels would reach on the longer
+    series with the same parameters. Only hours after last_timestamp are used;
+    missing hours between observations are filled with their one-step forecast,
+    which advances the states without moving them. Trailing missing hours are
+    not folded in, so last_timestamp never moves past the newest observation.
+    Returns the number of hours folded in.
+    """
+    last = pd.Timestamp(artifact["last_timestamp"])
+    observations = observations[observations.index > last].dropna()
+    if observations.empty:
+        return 0
+    hours = pd.date_range(last + pd.Timedelta(hours=1), observations.index.max(), freq="h")
+    values = observations.reindex(hours).to_numpy(dtype=np.float64)
+
+    params = artifact["params"]
+    alpha, gamma = params["alpha"], params["gamma"]
+    has_trend = bool(artifact["trend"])
+    beta = params["beta"] if has_trend else 0.0
+    phi = params["phi"] if has_trend and artifact["damped"] else 1.0
+    level, slope = artifact["level"], artifact["slope"]
+    season, season_prev = list(artifact["season"]), artifact["season_prev"]
+    m, pos = len(season), 0  # season is used as a ring buffer, pos = oldest state
+
+    for y in values:
+        s_old = season[pos]
+        base = level + slope * phi
+        if np.isnan(y):
+            y = base + s_old
+        new_level = alpha * y - alpha * s_old + (1 - alpha) * base
+        if has_trend:
+            slope = beta * (new_level - level) + (1 - beta) * (slope * phi)
+        season[pos] = gamma * y - gamma * base + (1 - gamma) * s_old
+        season_prev, level = s_old, new_level
+        pos = (pos + 1) % m
+
+    artifact.update({
+        "level": float(level),
+        "slope": float(slope),
+        "season": season[pos:] + season[:pos],
+        "season_prev": float(season_prev),
+        "nobs": artifact["nobs"] + len(values),
+        "last_timestamp": hours[-1].isoformat(),
+    })
+    return len(values)
+
+
+class HWBatch:
+    """
+    Many HWStates stacked into arrays (one row per series), so the forecasts of all
+    of them come out of a single broadcasted NumPy operation.
+    """
+
+    def __init__(self, models: list):
+        self.level = np.array([m.level for m in models], dtype=np.float64)
+        self.slope = np.array([m.slope for m in models], dtype=np.float64)
+        self.phi = np.array([np.nan if m.phi is None else m.phi for m in models], dtype=np.float64)
+        self.profile = np.stack([m.profile for m in models]) if models else np.empty((0, 0))
+        self._weights = {}
+
+    def __len__(self) -> int:
+        return len(self.level)
+
+    def _trend_weights(self, steps: int) -> np.ndarray:
+        if steps not in self._weights:
+            h = np.arange(1, steps + 1, dtype=np.float64)
+            damped = ~np.isnan(self.phi)
+            weights = np.tile(h, (len(self), 1))
+            weights[damped] = np.cumsum(self.phi[damped, None] ** h, axis=1)
+            self._weights[steps] = weights
+        return self._weights[steps]
+
+    def forecast(self, steps: int = 24, start: np.ndarray | None = None) -> np.ndarray:
+        """
+        (series x steps) forecasts, row i identical to models[i].forecast(steps, start[i]);
+        start defaults to 1 (the hour after each model's last state) for every row.
+        """
+        m = self.profile.shape[1]
+        if start is not None and np.any(start != 1):
+            offsets = np.asarray(start, dtype=np.int64)[:, None] - 1 + np.arange(steps)
+            trend = _trend_weights_at(self.phi[:, None], offsets + 1.0) * self.slope[:, None]
+            return self.level[:, None] + trend + np.take_along_axis(self.profile, offsets % m, axis=1)
+
+        season = self.profile[:, :steps] if steps <= m else self.profile[:, np.arange(steps) % m]
+        return self.level[:, None] + self._trend_weights(steps) * self.slope[:, None] + season
@@ -0,0 +1,185 @@
+"""
+Single memory-mapped bundle of every Holt-Winters model, for serving.
+
+Layout (one file, little-endian):
+    8 bytes   magic b"HWBUNDLE"
+    8 bytes   uint64 length of the JSON header
+    header    JSON: version, field names, seasonal_periods, data checksum and the
+              in-file index {series name: row + metadata}
+    padding   up to a 64-byte boundary
+    data      float64 matrix, one row per model:
+              alpha, beta, gamma, phi, level, slope, season_last, profile[m]
+
+phi and beta are NaN when unused; profile holds the seasonal states of the next m
+hours (as HWStates expects them) and season_last the newest state, so a row keeps
+all of an artifact's states. Readers parse the header once and memory-map the data
+block: looking a model up is a dict access plus a zero-copy row view, and the
+pages are shared by every process that maps the file.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import HW_BUNDLE_FILE
+from src.storage.hw_artifact import HWStates
+from src.storage.series_matrix import series_name
+
+BUNDLE_MAGIC = b"HWBUNDLE"
+BUNDLE_VERSION = 1
+FIELDS = ["alpha", "beta", "gamma", "phi", "level", "slope", "season_last"]
+_ALIGN = 64
+
+
+def _nan(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def write_hw_bundle(artifacts: list, path: Path = HW_BUNDLE_FILE) -> Path:
+    """Pack artifacts (see hw_artifact.py) into one bundle, swapped in atomically."""
+    path = Path(path)
+    if not artifacts:
+        raise ValueError("No Holt-Winters artifacts to bundle")
+    periods = {a["seasonal_periods"] for a in artifacts}
+    if len(periods) != 1:
+        raise ValueError(f"All bundled models need the same seasonal period, got {sorted(periods)}")
+    m = periods.pop()
+
+    data = np.empty((len(artifacts), len(FIELDS) + m), dtype="<f8")
+    index = {}
+    for row, a in enumerate(artifacts):
+        params = a["params"]
+        damped = a["trend"] and a["damped"]
+        data[row, :len(FIELDS)] = [params["alpha"], _nan(params["beta"]), params["gamma"],
+                                   params["phi"] if damped else np.nan,
+                                   a["level"], a["slope"], a["season"][-1]]
+        data[row, len(FIELDS):] = a["season"][:-1] + [a["season_prev"]]
+        index[series_name(a["country"], a["target"])] = {
+            "row": row,
+            "country": a["country"],
+            "target": a["target"],
+            "trend": a["trend"],
+            "damped": bool(a["damped"]),
+            "nobs": a["nobs"],
+            "last_timestamp": a["last_timestamp"],
+        }
+
+    payload = data.tobytes()
+    header = json.dumps({
+        "version": BUNDLE_VERSION,
+        "fields": FIELDS + [f"profile_{k}" for k in range(m)],
+        "seasonal_periods": m,
+        "rows": len(artifacts),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "series": index,
+    }).encode()
+    offset = -(-(16 + len(header)) // _ALIGN) * _ALIGN
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(b"\0" * (offset - 16 - len(header)))
+        f.write(payload)
+    os.replace(tmp, path)
+    return path
+
+
+class HWBundle:
+    """
+    Lazily opened, read-only view of a bundle written by write_hw_bundle().
+
+    Nothing is read until the first lookup; refresh() re-opens the file on the next
+    lookup once it was replaced (a new bundle is swapped in with os.replace).
+    Models are HWStates over zero-copy views of their rows, built once per row.
+    """
+
+    def __init__(self, path: Path = HW_BUNDLE_FILE):
+        self.path = Path(path)
+        self._mtime = None
+        self._close()
+
+    def _close(self):
+        self._header, self._data, self._offset, self._models = None, None, None, {}
+
+    def refresh(self) -> bool:
+        """True if a bundle exists; drops the open mapping if the file changed since."""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._mtime = None
+            self._close()
+            return False
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._close()
+        return True
+
+    def _read_header(self) -> tuple:
+        with open(self.path, "rb") as f:
+            if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                raise ValueError(f"{self.path.name} is not a Holt-Winters bundle")
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+        if header.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported Holt-Winters bundle version in {self.path.name}: {header.get('version')}")
+        return header, -(-(16 + length) // _ALIGN) * _ALIGN
+
+    def _open(self):
+        if self._header is None:
+            self._header, self._offset = self._read_header()
+            shape = (self._header["rows"], len(self._header["fields"]))
+            self._data = np.memmap(self.path, dtype="<f8", mode="r", offset=self._offset, shape=shape)
+
+    def __len__(self) -> int:
+        self._open()
+        return self._header["rows"]
+
+    def names(self) -> list:
+        self._open()
+        return list(self._header["series"])
+
+    def get(self, country: str, target: str) -> HWStates | None:
+        """Model of one series, or None if it is not in the bundle."""
+        self._open()
+        name = series_name(country, target)
+        model = self._models.get(name)
+        if model is None:
+            entry = self._header["series"].get(name)
+            if entry is None:
+                return None
+            row = self._data[entry["row"]]
+            phi = row[FIELDS.index("phi")]
+            last_time = pd.Timestamp(entry["last_timestamp"]) if entry["last_timestamp"] else None
+            model = self._models[name] = HWStates(float(row[FIELDS.index("level")]), float(row[FIELDS.index("slope")]),
+                                                  None if np.isnan(phi) else float(phi), row[len(FIELDS):], last_time)
+        return model
+
+    def verify(self) -> dict:
+        """
+        Integrity check: magic, version, file size and the data checksum. Reads the
+        file once but builds no models; raises ValueError on a corrupt bundle.
+        """
+        if not self.path.exists():
+            raise FileNotFoundError(f"❌ No Holt-Winters bundle at {self.path}")
+        header, offset = self._read_header()
+        size = header["rows"] * len(header["fields"]) * 8
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            payload = f.read()
+        if len(payload) != size:
+            raise ValueError(f"Bundle data is {len(payload)} bytes, expected {size}")
+        if hashlib.sha256(payload).hexdigest() != header["sha256"]:
+            raise ValueError("Bundle checksum mismatch")
+        return {"models": header["rows"], "bytes": offset + size, "sha256": header["sha256"]}
@@ -0,0 +1,207 @@
+"""
+Partitioned columnar store for raw generation data.
+
+Layout:  <root>/country=<CC>/year=<YYYY>/part.parquet
+
+Each partition holds one country-year with the full column schema, so a reader
+only opens the files it needs: loading one country never touches the others,
+and time-range filters are pushed down to the Parquet row groups.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import uuid
+import hashlib
+import shutil
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import RAW_STORE_DIR, DATA_FILE_RAW, TARGET_COLS
+
+KEY_COLS = ["datetime_utc", "Country"]
+SCHEMA_COLS = KEY_COLS + TARGET_COLS
+
+
+def _partition_path(root: Path, country: str, year: int) -> Path:
+    return root / f"country={country}" / f"year={year}" / "part.parquet"
+
+
+def _to_timestamp(value) -> pd.Timestamp | None:
+    """Accept str/datetime/Timestamp bounds and normalise them to UTC timestamps."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _standardize(df: pd.DataFrame) -> pd.DataFrame:
+    """Enforce the store schema: UTC timestamps, all target columns present as float64."""
+    df = df.copy()
+    df["datetime_utc"] = pd.to_datetime(df["datetime_utc"], utc=True)
+    for col in TARGET_COLS:
+        df[col] = df[col].astype("float64") if col in df.columns else float("nan")
+    return df[SCHEMA_COLS]
+
+
+class RawStoreWriter:
+    """
+    Streaming writer for the raw store.
+
+    append() can be called once per country (from several threads) as soon as
+    that country's data is ready; its partitions are written to a private staging
+    directory right away, so only one block is ever held in memory. finalize()
+    publishes every staged partition with an atomic rename; abort() discards them.
+    With merge=True staged partitions are merged with the live ones (new rows win
+    on duplicate (datetime_utc, Country)); otherwise touched partitions are replaced.
+    """
+
+    def __init__(self, root: Path = RAW_STORE_DIR, merge: bool = True):
+        self.root = root
+        self.merge = merge
+        self.staging_dir = root / f".staging-{uuid.uuid4().hex[:8]}"
+        self.staged = {}  # live partition path -> staged file
+        self.lock = threading.Lock()
+
+    def append(self, df: pd.DataFrame) -> list:
+        """Stage the rows of df into their country/year partitions."""
+        df = _standardize(df)
+        staged = []
+
+        for (country, year), part in df.groupby(["Country", df["datetime_utc"].dt.year], sort=True):
+            live_path = _partition_path(self.root, country, year)
+            stage_path = _partition_path(self.staging_dir, country, year)
+
+            # A partition staged earlier in this run already contains the live rows
+            if stage_path.exists():
+                part = pd.concat([pq.read_table(stage_path).to_pandas(), part], ignore_index=True)
+            elif self.merge and live_path.exists():
+                part = pd.concat([pq.read_table(live_path).to_pandas(), part], ignore_index=True)
+
+            part = (
+                part.drop_duplicates(subset=KEY_COLS, keep="last")
+                .sort_values("datetime_utc", kind="stable")
+                .reset_index(drop=True)
+            )
+
+            stage_path.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(part, preserve_index=False), stage_path)
+            with self.lock:
+                self.staged[live_path] = stage_path
+            staged.append(live_path)
+
+        return staged
+
+    def finalize(self) -> list:
+        """Move all staged partitions into place; each rename is atomic."""
+        published = []
+        for live_path, stage_path in sorted(self.staged.items()):
+            live_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(stage_path, live_path)
+            published.append(live_path)
+
+        self.staged = {}
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        return published
+
+    def abort(self):
+        """Drop everything staged so far; the live store is untouched."""
+        self.staged = {}
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def write_partitions(df: pd.DataFrame, root: Path = RAW_STORE_DIR, merge: bool = True) -> list:
+    """
+    Write raw generation rows into their country/year partitions in one go.
+    With merge=True the rows are merged into existing partitions (new rows win on
+    duplicate (datetime_utc, Country)); otherwise touched partitions are replaced.
+    """
+    writer = RawStoreWriter(root, merge=merge)
+    writer.append(df)
+    return writer.finalize()
+
+
+def list_countries(root: Path = RAW_STORE_DIR) -> list:
+    """Countries that have at least one partition in the store."""
+    if not root.exists():
+        return []
+    return sorted(p.name.split("=", 1)[1] for p in root.glob("country=*") if p.is_dir())
+
+
+def list_partitions(root: Path = RAW_STORE_DIR, countries: list | None = None, start=None, end=None) -> list:
+    """Partition files for the given countries, pruned to the years overlapping [start, end)."""
+    start, end = _to_timestamp(start), _to_timestamp(end)
+    countries = countries if countries is not None else list_countries(root)
+
+    paths = []
+    for country in countries:
+        for year_dir in sorted((root / f"country={country}").glob("year=*")):
+            year = int(year_dir.name.split("=", 1)[1])
+            if start is not None and year < start.year:
+                continue
+            if end is not None and pd.Timestamp(year=year, month=1, day=1, tz="UTC") >= end:
+                continue
+            path = year_dir / "part.parquet"
+            if path.exists():
+                paths.append(path)
+    return paths
+
+
+def read_raw(countries: list | None = None, columns: list | None = None, start=None, end=None,
+             root: Path = RAW_STORE_DIR) -> pd.DataFrame:
+    """
+    Load raw generation data from the partitioned store.
+
+    countries: only read these countries' partitions (default: all)
+    columns:   column projection; datetime_utc and Country are always included
+    start/end: half-open time range [start, end), pushed down to the Parquet reader
+    """
+    paths = list_partitions(root, countries, start, end)
+    if not paths:
+        raise FileNotFoundError(f"No raw data partitions found in {root} for countries={countries}")
+
+    if columns is not None:
+        columns = KEY_COLS + [c for c in columns if c not in KEY_COLS]
+
+    filters = []
+    if start is not None:
+        filters.append(("datetime_utc", ">=", _to_timestamp(start)))
+    if end is not None:
+        filters.append(("datetime_utc", "<", _to_timestamp(end)))
+
+    tables = [pq.read_table(p, columns=columns, filters=filters or None) for p in paths]
+    return pa.concat_tables(tables).to_pandas()
+
+
+def raw_store_fingerprint(root: Path = RAW_STORE_DIR) -> str:
+    """SHA-256 over every partition's path and bytes; changes whenever any stored data changes."""
+    paths = list_partitions(root)
+    if not paths:
+        raise FileNotFoundError(f"No raw data partitions found in {root}")
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path.relative_to(root)).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def migrate_csv(csv_path: Path = DATA_FILE_RAW, root: Path = RAW_STORE_DIR):
+    """One-off conversion of the legacy single raw CSV into the partitioned store."""
+    print(f"📦 Converting {csv_path.name} into partitioned store at {root}...")
+    df = pd.read_csv(csv_path)
+    written = write_partitions(df, root, merge=False)
+    print(f"✅ Wrote {len(written)} partitions for {df['Country'].nunique()} countries")
+
+
+if __name__ == "__main__":
+    migrate_csv(Path(sys.argv[1]) if len(sys.argv) > 1 else DATA_FILE_RAW)
@@ -0,0 +1,149 @@
+"""
+Wide memory-mapped matrix of processed (country, target) series.
+
+Layout (one directory):
+    values-<gen>.npy     float32, hours x series, Fortran order (each series is contiguous)
+    index-<gen>.npy      int64 UTC nanoseconds, shared hourly index of all series
+    series_catalog.json  one entry per column: country, target, column, [start, stop) rows,
+                         plus the names of the values/index files of its generation
+
+The catalog is the only pointer to the arrays: a write puts the arrays of a new
+generation next to the old ones and then replaces the catalog, so a reader always
+gets the arrays that belong to the catalog it read.
+
+Rows outside a series' [start, stop) range are NaN. Opening the matrix memory-maps
+both arrays, so loading every series costs a few milliseconds and slicing a series
+never copies its values.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import SERIES_MATRIX_DIR
+
+VALUES_FILE = "values.npy"   # unversioned names of matrices written before generations existed
+INDEX_FILE = "index.npy"
+CATALOG_FILE = "series_catalog.json"
+
+
+def series_name(country: str, target: str) -> str:
+    """Same naming as the per-series CSVs / model files, e.g. 'DE_Wind_Onshore'."""
+    return f"{country}_{target.replace(' ', '_')}"
+
+
+def write_series_matrix(values: np.ndarray, index: np.ndarray, series: list, root: Path = SERIES_MATRIX_DIR) -> Path:
+    """
+    Persist a (hours x series) matrix with its int64 hourly index and catalog.
+
+    `series` lists one dict per column (in column order) with the keys
+    country, target, start and stop. The arrays are written as a new generation
+    under their own file names, then the catalog naming them is swapped in with
+    os.replace, so readers never see a half-written matrix or arrays of another
+    generation. The previous generation is kept for readers that opened its
+    catalog just before the swap; older ones are deleted.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    if values.shape != (len(index), len(series)):
+        raise ValueError(f"Matrix shape {values.shape} does not match index ({len(index)}) x series ({len(series)})")
+
+    previous = _read_catalog(root)
+    generation = previous.get("generation", 0) + 1 if previous else 1
+    catalog = {
+        "generation": generation,
+        "values_file": f"values-{generation}.npy",
+        "index_file": f"index-{generation}.npy",
+        "n_hours": int(len(index)),
+        "dtype": "float32",
+        "series": [{
+            "name": series_name(s["country"], s["target"]),
+            "country": s["country"],
+            "target": s["target"],
+            "column": col,
+            "start": int(s["start"]),
+            "stop": int(s["stop"]),
+        } for col, s in enumerate(series)],
+    }
+
+    arrays = {
+        catalog["values_file"]: np.asfortranarray(values, dtype=np.float32),
+        catalog["index_file"]: np.ascontiguousarray(index, dtype=np.int64),
+    }
+    for name, array in arrays.items():
+        tmp = root / f".{name}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, root / name)
+
+    # The catalog is the commit point: until it is replaced, readers see the previous generation
+    tmp = root / f".{CATALOG_FILE}.tmp"
+    tmp.write_text(json.dumps(catalog, indent=2))
+    os.replace(tmp, root / CATALOG_FILE)
+
+    keep = set(_array_files(catalog)) | (set(_array_files(previous)) if previous else set())
+    for path in [*root.glob("values*.npy"), *root.glob("index*.npy")]:
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+    return root
+
+
+def _read_catalog(root: Path) -> dict | None:
+    path = Path(root) / CATALOG_FILE
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def _array_files(catalog: dict) -> tuple:
+    """(values, index) file names of a catalog's generation."""
+    return catalog.get("values_file", VALUES_FILE), catalog.get("index_file", INDEX_FILE)
+
+
+class SeriesMatrix:
+    """Read-only, memory-mapped view of a series matrix written by write_series_matrix()."""
+
+    def __init__(self, root: Path = SERIES_MATRIX_DIR):
+        self.root = Path(root)
+        self.catalog = _read_catalog(self.root)
+        if self.catalog is None:
+            raise FileNotFoundError(f"❌ No series matrix at {self.root}")
+
+        # Only the files the catalog names, so values, index and catalog are always one generation
+        values_file, index_file = _array_files(self.catalog)
+        self.values = np.load(self.root / values_file, mmap_mode="r")
+        self.index = np.load(self.root / index_file, mmap_mode="r")
+        self._entries = {entry["name"]: entry for entry in self.catalog["series"]}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def names(self) -> list:
+        return list(self._entries)
+
+    def _entry(self, country: str, target: str) -> dict:
+        name = series_name(country, target)
+        if name not in self._entries:
+            raise KeyError(f"Series {name} not in matrix")
+        return self._entries[name]
+
+    def array(self, country: str, target: str) -> np.ndarray:
+        """Zero-copy float32 view of one series (only its own rows)."""
+        entry = self._entry(country, target)
+        return self.values[entry["start"]:entry["stop"], entry["column"]]
+
+    def series(self, country: str, target: str) -> pd.Series:
+        """One series as a pandas Series on a UTC hourly DatetimeIndex named datetime_utc."""
+        entry = self._entry(country, target)
+        rows = slice(entry["start"], entry["stop"])
+        index = pd.DatetimeIndex(np.asarray(self.index[rows]).view("datetime64[ns]"), name="datetime_utc").tz_localize("UTC")
+        return pd.Series(self.values[rows, entry["column"]], index=index, name=entry["target"], copy=False)
@@ -1,66 +1,272 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # --- CONFIGURATION ---
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
-RAW_DATA_FILE = PROJECT_ROOT / "data" / "01_raw" / "generation_2024_raw.csv"
+sys.path.append(str(PROJECT_ROOT))
+
+from config import RAW_STORE_DIR, SERIES_MATRIX_DIR
+from src.storage.raw_store import read_raw
+from src.storage.series_matrix import series_name, write_series_matrix
+
 PROCESSED_DIR = PROJECT_ROOT / "data" / "02_processed" / "lightweight"
+# Content hash of every series' raw input; series whose hash is unchanged are not reprocessed
+MANIFEST_FILE = PROCESSED_DIR / "manifest.json"
+# Bump when the preprocessing logic changes so every series is rebuilt once
+MANIFEST_VERSION = 1
 
 # Ensure the output directory exists
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
 TARGETS = ["Solar", "Wind Onshore", "Wind Offshore"]
 
-def preprocess_lightweight_data():
+def build_hourly_matrix(df: pd.DataFrame) -> tuple:
+    """
+    Resample and gap-fill every (country, target) series at once.
+
+    One sort + one groupby produces the hourly means of all series; they are laid
+    out side by side in a wide (hour x (target, country)) frame and interpolated
+    together. Returns the wide frame and each country's [first, last] hour, which
+    bounds its series exactly like a per-series resample would.
+    """
+    df = df.sort_values(["Country", "datetime_utc"], kind="stable")
+    hours = df["datetime_utc"].dt.floor("h")
+
+    # Hourly mean per country (same bins as resample("h").mean())
+    hourly = df[TARGETS].groupby([df["Country"], hours]).mean()
+    spans = hourly.index.to_frame(index=False).groupby("Country")["datetime_utc"].agg(["min", "max"])
+
+    wide = hourly.unstack("Country")
+    wide = wide.reindex(pd.date_range(spans["min"].min(), spans["max"].max(), freq="h", name="datetime_utc"))
+
+    # Which series have any real data (e.g. Austria has no Offshore Wind)
+    available = {(target, country): wide.loc[span["min"]:span["max"], (target, country)].notna().any()
+                 for country, span in spans.iterrows() for target in TARGETS}
+
+    # Interpolate small gaps (linear) for all series in one call; leading gaps stay NaN
+    wide = wide.interpolate(method="linear")
+    return wide, spans, available
+
+# --- SERIES WRITER (shared by the serial run and the process pool) ---
+# The wide matrix lives in module globals: set directly for serial runs, or attached
+# from shared memory in each pool worker, so workers read zero-copy views of it
+# instead of receiving pickled copies of their slices.
+_VALUES = None   # float64 (hours x series), Fortran order -> every series is contiguous
+_INDEX = None    # int64 UTC nanoseconds of the hourly index
+_SHM = []        # keeps the worker's shared memory mappings alive
+
+def _attach_shared(values_name: str, values_shape: tuple, index_name: str, index_len: int):
+    """Pool initializer: map the parent's shared memory blocks as numpy views."""
+    global _VALUES, _INDEX, _SHM
+    values_shm = shared_memory.SharedMemory(name=values_name)
+    index_shm = shared_memory.SharedMemory(name=index_name)
+    _SHM = [values_shm, index_shm]
+    _VALUES = np.ndarray(values_shape, dtype=np.float64, buffer=values_shm.buf, order="F")
+    _INDEX = np.ndarray((index_len,), dtype=np.int64, buffer=index_shm.buf)
+
+def _write_series(task: tuple) -> tuple:
+    """Cut one series out of the wide matrix, fill remaining NaNs with 0 and save it as CSV."""
+    col, start, stop, target, filename = task
+    t0 = time.perf_counter()
+
+    index = pd.DatetimeIndex(_INDEX[start:stop].view("datetime64[ns]"), name="datetime_utc").tz_localize("UTC")
+    series_df = pd.DataFrame({target: _VALUES[start:stop, col]}, index=index).fillna(0.0)
+
+    # We save as a simple CSV: index=datetime, column=value
+    series_df.to_csv(PROCESSED_DIR / filename)
+    return filename, time.perf_counter() - t0
+
+def _run_parallel(values: np.ndarray, index: np.ndarray, tasks: list, workers: int):
+    """Publish the matrix via shared memory once, then fan the series out over a process pool."""
+    values_shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    index_shm = shared_memory.SharedMemory(create=True, size=max(index.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=values_shm.buf, order="F")[:] = values
+        np.ndarray(index.shape, dtype=np.int64, buffer=index_shm.buf)[:] = index
+
+        initargs = (values_shm.name, values.shape, index_shm.name, len(index))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared, initargs=initargs) as pool:
+            futures = [pool.submit(_write_series, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        values_shm.close()
+        values_shm.unlink()
+        index_shm.close()
+        index_shm.unlink()
+
+def _run_serial(values: np.ndarray, index: np.ndarray, tasks: list):
+    global _VALUES, _INDEX
+    _VALUES, _INDEX = values, index
+    for task in tasks:
+        yield _write_series(task)
+
+def _write_matrix(values: np.ndarray, index: np.ndarray, tasks: list, countries: dict):
+    """Store every series side by side as one float32 matrix (same values as the CSVs)."""
+    matrix = np.full((len(index), len(tasks)), np.nan, dtype=np.float32, order="F")
+    series = []
+    for j, (col, start, stop, target, _) in enumerate(tasks):
+        matrix[start:stop, j] = np.nan_to_num(values[start:stop, col], nan=0.0)
+        series.append({"country": countries[col], "target": target, "start": start, "stop": stop})
+    return write_series_matrix(matrix, index, series, SERIES_MATRIX_DIR)
+
+def series_hashes(df: pd.DataFrame) -> dict:
+    """
+    SHA-256 of each series' raw input slice: the country's timestamps (they set the
+    series' hourly span) plus the target's values, in the same order build_hourly_matrix uses.
+    """
+    df = df.sort_values(["Country", "datetime_utc"], kind="stable")
+    hashes = {}
+    for country, block in df.groupby("Country", sort=True):
+        stamps = block["datetime_utc"].dt.as_unit("ns").to_numpy(dtype="datetime64[ns]").view(np.int64).tobytes()
+        for target in TARGETS:
+            digest = hashlib.sha256(stamps)
+            digest.update(block[target].to_numpy(dtype=np.float64).tobytes())
+            hashes[(country, target)] = digest.hexdigest()
+    return hashes
+
+def _load_manifest() -> dict:
+    if not MANIFEST_FILE.exists():
+        return {}
+    with open(MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    # Manifests of an older preprocessing version describe outputs we would no longer produce
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+def _write_manifest(manifest: dict):
+    """Written via temp file so a crash never leaves half a manifest."""
+    tmp_file = MANIFEST_FILE.with_suffix(".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, MANIFEST_FILE)
+
+def _is_current(entry: dict | None, digest: str) -> bool:
+    """Unchanged input and the output from last time is still there."""
+    if entry is None or entry["hash"] != digest:
+        return False
+    return entry["status"] == "empty" or (PROCESSED_DIR / entry["file"]).exists()
+
+def preprocess_lightweight_data(workers: int = 1, output_format: str = "csv", force: bool = False):
     print("🚀 STARTING PREPROCESSING FOR LIGHTWEIGHT MODELS")
+    t0 = time.perf_counter()
     
-    if not RAW_DATA_FILE.exists():
-        raise FileNotFoundError(f"❌ Raw data not found at {RAW_DATA_FILE}")
+    if not RAW_STORE_DIR.exists():
+        raise FileNotFoundError(f"❌ Raw data not found at {RAW_STORE_DIR}")
 
-    print(f"   Loading raw data from: {RAW_DATA_FILE.name}...")
-    df = pd.read_csv(RAW_DATA_FILE)
-    
-    # 1. Standardize Time
-    df["datetime_utc"] = pd.to_datetime(df["datetime_utc"], utc=True)
-    
-    # 2. Get Unique Countries
-    countries = df["Country"].unique()
-    print(f"   Found countries: {', '.join(countries)}")
+    print(f"   Loading raw data from: {RAW_STORE_DIR.name}...")
+    # 1. Load only the columns we need (timestamps come back as UTC datetimes)
+    df = read_raw(columns=TARGETS)
 
-    processed_count = 0
+    # 2. Compare each series' input hash with the manifest of the last run
+    hashes = series_hashes(df)
+    # --force ignores the recorded series, but keeps the manifest's other entries (e.g. the matrix hash)
+    manifest = _load_manifest()
+    previous = {} if force else manifest.get("series", {})
+    write_csv = output_format in ("csv", "both")
 
-    for country in countries:
-        print(f"\n🌍 Processing Country: {country}")
-        
-        for target in TARGETS:
-            # 3. Filter Data for specific Country & Target
-            mask = (df["Country"] == country)
-            
-            # Select only time and the specific target column
-            series_df = df.loc[mask, ["datetime_utc", target]].set_index("datetime_utc")
-            
-            # 4. Check for Empty Data (e.g., Austria has no Offshore Wind)
-            if target not in series_df.columns or series_df[target].isna().all() or series_df.empty:
-                print(f"      ⚠️ Skipping {target} (No valid data found)")
-                continue
-            
-            # 5. Force Hourly Frequency & Handle Missing Values
-            # Holt-Winters CRASHES if there are missing hours. We must fill them.
-            series_df = series_df.resample("h").mean()
-            
-            # Interpolate small gaps (linear) and fill remaining NaNs with 0
-            series_df[target] = series_df[target].interpolate(method="linear").fillna(0.0)
-            
-            # 6. Save Individual Series
-            # We save as a simple CSV: index=datetime, column=value
-            filename = f"processed_{country}_{target.replace(' ', '_')}.csv"
-            save_path = PROCESSED_DIR / filename
-            
-            series_df.to_csv(save_path)
-            processed_count += 1
-            print(f"      ✅ Saved: {filename}")
-
-    print(f"\n✨ Preprocessing Complete. {processed_count} files saved to {PROCESSED_DIR}")
+    stale = {key for key, digest in hashes.items()
+             if write_csv and not _is_current(previous.get(series_name(*key)), digest)}
+    skipped = sorted(series_name(*key) for key in hashes if write_csv and key not in stale)
+    if write_csv:
+        print(f"   {len(stale)} of {len(hashes)} series changed since the last run ({len(skipped)} skipped)")
+
+    # The matrix holds every series, so it is rebuilt from all countries whenever any input changed
+    matrix_hash = hashlib.sha256(json.dumps(sorted(hashes.values())).encode()).hexdigest()
+    build_matrix = output_format in ("matrix", "both") and (
+        force or manifest.get("matrix_hash") != matrix_hash or not SERIES_MATRIX_DIR.exists())
+    if not build_matrix:
+        df = df[df["Country"].isin({country for country, _ in stale})]
+
+    # Entries of series that no longer exist in the raw data are dropped
+    series_entries = {series_name(*key): previous[series_name(*key)]
+                      for key in hashes if series_name(*key) in previous}
+    tasks = []
+    if not df.empty:
+        # 3. Resample + gap-fill all series together
+        # Holt-Winters CRASHES if there are missing hours. We must fill them.
+        wide, spans, available = build_hourly_matrix(df)
+        countries = spans.index
+        print(f"   Processing countries: {', '.join(countries)}")
+
+        # 4. One task per series: its column in the wide matrix and its country's row range
+        for country in countries:
+            start = wide.index.get_loc(spans.loc[country, "min"])
+            stop = wide.index.get_loc(spans.loc[country, "max"]) + 1
+
+            for target in TARGETS:
+                # Check for Empty Data (e.g., Austria has no Offshore Wind)
+                if not available[(target, country)]:
+                    if (country, target) in stale:
+                        print(f"      ⚠️ Skipping {country} {target} (No valid data found)")
+                    continue
+                col = wide.columns.get_loc((target, country))
+                tasks.append((col, start, stop, target, f"processed_{series_name(country, target)}.csv"))
+
+        values = np.asfortranarray(wide.to_numpy(dtype=np.float64))
+        index = wide.index.as_unit("ns").asi8
+
+    if build_matrix:
+        country_of_col = {wide.columns.get_loc((target, country)): country
+                          for target, country in wide.columns}
+        matrix_dir = _write_matrix(values, index, tasks, country_of_col)
+        manifest["matrix_hash"] = matrix_hash
+        print(f"\n🧮 Series matrix ({len(index)} hours x {len(tasks)} series) saved to {matrix_dir}")
+
+    # 5. Save Individual Series (only those whose inputs changed)
+    stale_files = {f"processed_{series_name(*key)}.csv": key for key in stale}
+    csv_tasks = [task for task in tasks if task[4] in stale_files]
+    timings = {}
+    if csv_tasks:
+        print(f"\n💾 Writing {len(csv_tasks)} series with {workers} worker{'s' if workers > 1 else ''}...")
+        runner = (_run_parallel(values, index, csv_tasks, workers) if workers > 1
+                  else _run_serial(values, index, csv_tasks))
+
+        for filename, seconds in runner:
+            timings[filename] = seconds
+            print(f"      ✅ Saved: {filename} ({seconds * 1000:.0f} ms)")
+
+    if timings:
+        slowest = max(timings, key=timings.get)
+        print(f"\n⏱️  Series time: {sum(timings.values()):.2f}s total | slowest {slowest} ({timings[slowest]:.2f}s)")
+
+    # Only record series once their output is on disk. Series that became empty lose
+    # their old file, so training never picks up stale data for them
+    for filename, key in stale_files.items():
+        status = "written" if filename in timings else "empty"
+        if status == "empty":
+            (PROCESSED_DIR / filename).unlink(missing_ok=True)
+        series_entries[series_name(*key)] = {"hash": hashes[key], "file": filename, "status": status}
+
+    _write_manifest({
+        "version": MANIFEST_VERSION,
+        "matrix_hash": manifest.get("matrix_hash"),
+        "series": series_entries,
+        "last_run": {
+            "finished_at": pd.Timestamp.now(tz="UTC").isoformat(),
+            "format": output_format,
+            "processed": sorted(series_name(*key) for key in stale),
+            "skipped": skipped,
+        },
+    })
+
+    print(f"\n✨ Preprocessing Complete. {len(timings)} files saved to {PROCESSED_DIR} "
+          f"in {time.perf_counter() - t0:.2f}s")
 
 if __name__ == "__main__":
-    preprocess_lightweight_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Preprocess raw data into per-series files for Holt-Winters")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to write the series")
+    parser.add_argument("--format", choices=["csv", "matrix", "both"], default="csv",
+                        help="Per-series CSVs, one memory-mapped series matrix, or both")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and rebuild every series")
+    args = parser.parse_args()
+
+    preprocess_lightweight_data(workers=args.workers, output_format=args.format, force=args.force)
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+import pandas as pd
+from pathlib import Path
+from entsoe.exceptions import NoMatchingDataError
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import ENTSOE_CACHE_DIR
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a query is neither in the cache nor in the fixtures."""
+
+
+class CachedEntsoeClient:
+    """
+    Content-addressed on-disk cache in front of an EntsoePandasClient.
+
+    Every response is stored under the hash of (country, psr_type, start, end).
+    "No data" answers are cached too, so replays see exactly the same failures.
+    In replay mode the upstream API is never called: queries are served from the
+    cache directory or a read-only fixture directory, which makes ingestion runs
+    reproducible offline (CI, benchmarks) without an API key.
+    """
+
+    NO_DATA_SUFFIX = ".nodata"
+
+    def __init__(self, upstream=None, cache_dir: Path = ENTSOE_CACHE_DIR, replay: bool = False,
+                 fixture_dir: Path | None = None):
+        if upstream is None and not replay:
+            raise ValueError("❌ An upstream client is required unless running in replay mode.")
+
+        self.upstream = upstream
+        self.cache_dir = cache_dir
+        self.replay = replay
+        self.fixture_dir = fixture_dir
+        self.stats = {"hits": 0, "misses": 0}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(country: str, start: pd.Timestamp, end: pd.Timestamp, psr_type: str | None) -> str:
+        """Stable content address of a query (timestamps normalised to UTC)."""
+        start = pd.Timestamp(start).tz_convert("UTC").isoformat()
+        end = pd.Timestamp(end).tz_convert("UTC").isoformat()
+        payload = json.dumps([country, psr_type, start, end])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _roots(self) -> list:
+        return [root for root in (self.cache_dir, self.fixture_dir) if root is not None]
+
+    def _find(self, key: str) -> Path | None:
+        """Locate a cached response (data or no-data marker) in the cache or fixtures."""
+        for root in self._roots():
+            base = root / key[:2] / key
+            for path in (base.with_suffix(".pkl"), base.with_suffix(self.NO_DATA_SUFFIX)):
+                if path.exists():
+                    return path
+        return None
+
+    def _store(self, key: str, df: pd.DataFrame | None):
+        """Atomically write a response (or a no-data marker when df is None)."""
+        path = self.cache_dir / key[:2] / key
+        path = path.with_suffix(".pkl" if df is not None else self.NO_DATA_SUFFIX)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        if df is not None:
+            df.to_pickle(tmp_path)
+        else:
+            tmp_path.touch()
+        os.replace(tmp_path, path)
+
+    def contains(self, country: str, start: pd.Timestamp, end: pd.Timestamp, psr_type: str | None = None) -> bool:
+        return self._find(self.cache_key(country, start, end, psr_type)) is not None
+
+    def query_generation(self, country_code: str, start: pd.Timestamp, end: pd.Timestamp,
+                         psr_type: str | None = None, **kwargs) -> pd.DataFrame:
+        """Same signature as EntsoePandasClient.query_generation."""
+        key = self.cache_key(country_code, start, end, psr_type)
+        path = self._find(key)
+
+        if path is not None:
+            with self.lock:
+                self.stats["hits"] += 1
+            if path.suffix == self.NO_DATA_SUFFIX:
+                raise NoMatchingDataError()
+            return pd.read_pickle(path)
+
+        with self.lock:
+            self.stats["misses"] += 1
+        if self.replay:
+            raise CacheMissError(f"No cached response for {country_code} {psr_type} {start} → {end}")
+
+        try:
+            df = self.upstream.query_generation(country_code, start=start, end=end, psr_type=psr_type, **kwargs)
+        except NoMatchingDataError:
+            self._store(key, None)
+            raise
+
+        self._store(key, df)
+        return df
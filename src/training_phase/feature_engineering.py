@@ -1,3 +1,6 @@
+import sys
+import argparse
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -5,75 +8,220 @@ from pathlib import Path
 # CONFIGURATION
 # ==========================================
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
-RAW_DATA_PATH = PROJECT_ROOT / "data" / "01_raw" / "generation_2024_raw.csv"
+sys.path.append(str(PROJECT_ROOT))
+
+from config import RAW_STORE_DIR, FEATURE_STATE_FILE, TARGET_COLS
+from src.storage.raw_store import read_raw, list_countries, list_partitions
+from src.training_phase.feature_spec import (
+    FEATURE_SPEC, FEATURE_SPEC_VERSION, FeatureState, country_categorical, load_feature_states, save_feature_states,
+    serving_window,
+)
+
 PROCESSED_DIR = PROJECT_ROOT / "data" / "02_processed"
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
-def add_time_features(df: pd.DataFrame) -> pd.DataFrame:
-    df["hour"] = df["datetime_utc"].dt.hour
-    df["dayofweek"] = df["datetime_utc"].dt.dayofweek
-    df["month"] = df["datetime_utc"].dt.month
-    df["dayofyear"] = df["datetime_utc"].dt.dayofyear
-    df["weekofyear"] = df["datetime_utc"].dt.isocalendar().week.astype(int)
-    df["is_weekend"] = df["dayofweek"].isin([5, 6]).astype(int)
+def add_time_features(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    calendar = FEATURE_SPEC.calendar_features(df["datetime_utc"], compact=compact)
+    for col in calendar.columns:
+        df[col] = calendar[col].to_numpy()
     return df
 
-def build_features_dataframe(df: pd.DataFrame, target_col: str, save_csv: bool = True):
-    target_col = target_col.strip()
-    
-    # 1. PREP: Filter columns IMMEDIATELY to prevent interference from other targets
-    # This ensures NaNs in 'Wind Offshore' don't kill 'Solar' rows for Austria
-    relevant_cols = ["datetime_utc", "Country", target_col]
-    df = df[relevant_cols].copy()
-    
-    # 2. Fill NaNs for the TARGET only (e.g. fill Solar NaNs with 0)
-    # This saves landlocked countries if the target itself has gaps
-    df[target_col] = df[target_col].fillna(0)
-    
-    df["datetime_utc"] = pd.to_datetime(df["datetime_utc"], utc=True)
+def _save_features(df: pd.DataFrame, target_col: str):
+    safe_target = target_col.replace(" ", "_")
+    output_path = PROCESSED_DIR / f"features_{safe_target}.csv"
+    df.to_csv(output_path, index=False)
+    print(f"   💾 Features saved to: {output_path.name}")
+
+def _build_features(df: pd.DataFrame, targets: list, compact: bool):
+    """
+    Shared work of all targets done once: datetime parsing, sorting, calendar features,
+    country encoding and the history mask. Only the lag/rolling block is built per target.
+    Returns the kept (sorted) base rows and a generator of (target, X, y), which builds
+    each target's matrix only when it is requested.
+    """
+    # 1. PREP: Filter columns IMMEDIATELY; targets are handled one by one below, so
+    # NaNs in 'Wind Offshore' never kill 'Solar' rows for Austria
+    df = df[["datetime_utc", "Country"] + targets].copy()
+
+    if isinstance(df["datetime_utc"].dtype, pd.DatetimeTZDtype):
+        # Already timezone-aware (raw store): a plain conversion, no per-element parsing
+        df["datetime_utc"] = df["datetime_utc"].dt.tz_convert("UTC")
+    else:
+        df["datetime_utc"] = pd.to_datetime(df["datetime_utc"], utc=True)
     df = df.sort_values(["Country", "datetime_utc"])
 
-    # 3. Feature Engineering
-    df = add_time_features(df)
+    # 2. Drop rows with insufficient history (the first 168 hours of every country).
+    # Targets are 0-filled, so these are the same rows for every target.
+    countries = df["Country"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, countries[1:] != countries[:-1]])
+    position = np.arange(len(df)) - np.repeat(starts, np.diff(np.append(starts, len(df))))
+    keep = position >= FEATURE_SPEC.history
+    base = df[keep]
 
-    # Lags
-    lags = [1, 3, 6, 12, 24, 48, 168]
-    for lag in lags:
-        df[f"{target_col}_lag_{lag}"] = df.groupby("Country")[target_col].shift(lag)
+    # 3. Calendar features + Country Encoding (dummies for every country in the input)
+    calendar = FEATURE_SPEC.calendar_features(base["datetime_utc"], compact=compact).set_index(base.index)
+    if compact:
+        country = pd.DataFrame({"country": country_categorical(base["Country"])}, index=base.index)
+    else:
+        present = pd.Categorical(base["Country"], categories=np.unique(countries))
+        country = pd.get_dummies(present, prefix="country").set_index(base.index)
+        calendar_values = calendar.to_numpy(dtype=np.float64)
+        country_values = country.to_numpy(dtype=np.float64)
+        n_calendar = calendar_values.shape[1]
+
+    def per_target():
+        for target in targets:
+            # 4. Fill NaNs for the TARGET only (e.g. fill Solar NaNs with 0)
+            # This saves landlocked countries if the target itself has gaps
+            values = df[target].fillna(0).to_numpy(dtype=np.float64)
+
+            # Lags + Rolling Stats, computed per contiguous country block in one kernel (batch plan of the spec)
+            features = FEATURE_SPEC.batch(values, starts, dtype=np.float32 if compact else np.float64)[keep]
+            y = pd.Series(values[keep], index=base.index, name=target)
+            lag_rolling_cols = FEATURE_SPEC.lag_rolling_columns(target)
 
-    # Rolling Stats
-    for window in [24, 168]:
-        df[f"{target_col}_roll_mean_{window}"] = (
-            df.groupby("Country")[target_col].rolling(window).mean().reset_index(level=0, drop=True)
-        )
-        df[f"{target_col}_roll_std_{window}"] = (
-            df.groupby("Country")[target_col].rolling(window).std().reset_index(level=0, drop=True)
-        )
+            if compact:
+                lag_rolling = pd.DataFrame(features, index=base.index, columns=lag_rolling_cols)
+                yield target, pd.concat([calendar, lag_rolling, country], axis=1), y.astype(np.float32)
+            else:
+                # One float64 block written once, instead of concat + astype copies per target
+                X = np.empty((len(base), n_calendar + len(lag_rolling_cols) + country_values.shape[1]))
+                X[:, :n_calendar] = calendar_values
+                X[:, n_calendar:n_calendar + len(lag_rolling_cols)] = features
+                X[:, n_calendar + len(lag_rolling_cols):] = country_values
+                columns = list(calendar.columns) + lag_rolling_cols + list(country.columns)
+                del features
+                yield target, pd.DataFrame(X, index=base.index, columns=columns), y
 
-    # 4. Country Encoding
-    country_dummies = pd.get_dummies(df["Country"], prefix="country")
-    df = pd.concat([df, country_dummies], axis=1)
+    return base, per_target()
 
-    # 5. Drop rows with insufficient history (the first 168 hours)
-    df = df.dropna()
+def build_features_multi(df: pd.DataFrame, targets: list, compact: bool = False):
+    """
+    Features of several targets in one pass, yielded one target at a time as
+    (target, X, y, timestamps), each identical to
+    build_features_dataframe(df, target, save_csv=False, compact=compact).
+    The shared base is prepared once; a target's X is only built when the previous
+    one was consumed, so dropping it first keeps a single X in memory.
+    """
+    targets = [target.strip() for target in targets]
+    base, results = _build_features(df, targets, compact)
+    for target, X, y in results:
+        yield target, X, y, base["datetime_utc"]
+
+def build_features_dataframe(df: pd.DataFrame, target_col: str, save_csv: bool = True, compact: bool = False):
+    """
+    Build the XGBoost feature matrix X, target y and timestamps for one target.
+
+    compact=False gives the original float64 matrix with one-hot country_ columns.
+    compact=True gives float32 lag/rolling features, int8/int16 calendar features
+    and a single categorical "country" column (train with enable_categorical=True).
+    """
+    target_col = target_col.strip()
+    base, results = _build_features(df, [target_col], compact)
+    _, X, y = next(results)
 
     if save_csv:
-        safe_target = target_col.replace(" ", "_")
-        output_path = PROCESSED_DIR / f"features_{safe_target}.csv"
-        df.to_csv(output_path, index=False)
-        print(f"   💾 Features saved to: {output_path.name}")
+        _save_features(pd.concat([base[["datetime_utc", "Country"]], y, X], axis=1), target_col)
 
-    X = df.drop(columns=["datetime_utc", "Country", target_col])
-    y = df[target_col]
-    timestamps = df["datetime_utc"]
+    return X, y, base["datetime_utc"]
 
-    return X.astype(float), y.astype(float), timestamps
+def build_features_chunked(target_col: str, writer, root: Path = RAW_STORE_DIR) -> int:
+    """
+    Out-of-core variant of build_features_dataframe(compact=True).
+
+    Reads the raw store one country-year partition at a time, prepends the last
+    FEATURE_SPEC.history rows of the previous chunk (so every lag and rolling window
+    sees exactly the rows it would in a full build) and appends the chunk's features
+    to `writer` (a FeatureStoreWriter). Memory is bounded by one chunk, not by the
+    length of the history. Returns the number of feature rows written.
+    """
+    target_col = target_col.strip()
+    rows = 0
+    for country in list_countries(root):
+        carry = None
+        for path in list_partitions(root, [country]):
+            year = int(path.parent.name.split("=", 1)[1])
+            chunk = read_raw([country], columns=[target_col], root=root,
+                             start=f"{year}-01-01", end=f"{year + 1}-01-01")
+            if chunk.empty:
+                continue
+            chunk_start = chunk["datetime_utc"].min()
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+
+            X, y, timestamps = build_features_dataframe(chunk, target_col, save_csv=False, compact=True)
+            new = (timestamps >= chunk_start).to_numpy()
+            if new.any():
+                writer.append(X[new], y[new], timestamps[new])
+                rows += int(new.sum())
+
+            carry = chunk.sort_values("datetime_utc").tail(FEATURE_SPEC.history)
+        print(f"   🧩 {country}: features streamed ({rows} rows so far)")
+    return rows
+
+def refresh_feature_states(path: Path = FEATURE_STATE_FILE, root: Path = RAW_STORE_DIR, until=None) -> dict:
+    """
+    Advance the persisted online feature states up to the hour before `until`.
+
+    `until` defaults to today's serving lookup window (see serving_window), so the
+    XGBoost forecaster can start its step plan from the stored state instead of
+    rebuilding it from history. Only raw rows after the oldest state's last hour
+    are read, and each new hour is pushed in O(1). Series without a state are
+    bootstrapped from the FEATURE_SPEC.history + 1 hours before their newest raw
+    hour, and skipped while the store holds less than that. States already at or
+    past `until` are rebuilt the same way. Returns the updated {(country, target): FeatureState}.
+    """
+    until = serving_window()[1] if until is None else pd.Timestamp(until)
+    lookback = pd.Timedelta(hours=FEATURE_SPEC.history + 1)
+    states = {key: state for key, state in load_feature_states(path).items() if state.last_time < until}
+
+    # New series need a full lookback; tracked ones only the hours after their state
+    since = min((state.last_time + pd.Timedelta(hours=1) for state in states.values()), default=until - lookback)
+    if any((country, target) not in states for country in list_countries(root) for target in TARGET_COLS):
+        since = min(since, until - lookback)
+    df = read_raw(columns=TARGET_COLS, root=root, start=since, end=until)
+
+    pushed, skipped = 0, 0
+    for country, block in df.sort_values("datetime_utc").groupby("Country"):
+        block = block.set_index("datetime_utc")
+        for target in TARGET_COLS:
+            state = states.get((country, target))
+            if state is None:
+                end = block.index[-1] + pd.Timedelta(hours=1)
+                history = block[target]
+                if history.index[0] > end - lookback:
+                    # Newest hour lies before `until`: read the lookback ending there instead
+                    history = read_raw([country], columns=[target], root=root,
+                                       start=end - lookback, end=end).set_index("datetime_utc")[target]
+                if history.empty or history.index[0] > end - lookback:
+                    skipped += 1
+                    continue
+                states[(country, target)] = FeatureState.from_history(history, end)
+                continue
+            new = block.loc[block.index > state.last_time, target]
+            for timestamp, value in new.items():
+                state.push(value, timestamp)
+            pushed += len(new)
+
+    save_feature_states(states, path)
+    print(f"   🔁 Feature states refreshed up to {until}: {len(states)} series, {pushed} new hours pushed"
+          f"{f', {skipped} skipped (not enough history)' if skipped else ''}")
+    return states
 
 # Example usage for testing
 if __name__ == "__main__":
-    print(f"Loading raw data from {RAW_DATA_PATH}...")
-    if RAW_DATA_PATH.exists():
-        raw_df = pd.read_csv(RAW_DATA_PATH)
+    parser = argparse.ArgumentParser(description="Build XGBoost features")
+    parser.add_argument("--refresh-state", action="store_true",
+                        help="Only advance the online feature states to the hour before today's serving lookup window")
+    args = parser.parse_args()
+
+    if args.refresh_state:
+        refresh_feature_states()
+        sys.exit(0)
+
+    print(f"Loading raw data from {RAW_STORE_DIR}...")
+    if RAW_STORE_DIR.exists():
+        raw_df = read_raw()
         
         # Process and save for each target
         for target in ["Solar", "Wind Onshore", "Wind Offshore"]:
@@ -81,4 +229,4 @@ if __name__ == "__main__":
                 print(f"\nProcessing {target}...")
                 build_features_dataframe(raw_df, target_col=target, save_csv=True)
     else:
-        print("❌ Raw data file not found.")
\ No newline at end of file
+        print("❌ Raw data store not found.")
\ No newline at end of file
@@ -0,0 +1,440 @@
+"""
+Single definition of the XGBoost features, shared by training and serving.
+
+FeatureSpec declares the lags, rolling windows and calendar features once and
+compiles them into two plans that run the same kernels:
+  - batch():  every row of many country blocks at once (training / feature store)
+  - StepPlan: one row at a time during the recursive 24h forecast (serving),
+    driven by FeatureState, the O(1) online form of the same features
+Features of an hour t use the hourly target series up to and including t;
+missing values count as 0 (training fills target gaps with 0 as well).
+"""
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+
+from config import TARGET_COUNTRIES
+
+# Bump whenever the produced features change, so cached feature matrices are rebuilt
+FEATURE_SPEC_VERSION = 1
+
+# Compact mode: calendar features fit in small ints, country is one categorical column
+CALENDAR_DTYPES = {
+    "hour": "int8", "dayofweek": "int8", "month": "int8",
+    "dayofyear": "int16", "weekofyear": "int8", "is_weekend": "int8",
+}
+
+
+def country_categorical(countries) -> pd.Categorical:
+    """Country as a categorical with fixed categories, so codes match between training and serving."""
+    return pd.Categorical(countries, categories=TARGET_COUNTRIES)
+
+
+def lag_rolling_kernel(values: np.ndarray, starts: np.ndarray, lags, windows, dtype=np.float64) -> np.ndarray:
+    """
+    Lags and rolling mean/std for series stored back to back in one sorted array.
+
+    `starts` are the offsets where each country's block begins. All features are
+    written into one preallocated (n x features) matrix; rows without enough
+    history in their own block stay NaN, like groupby().shift()/rolling().
+    Rolling stats come from cumulative sums of the block's centered values; a window
+    of identical values gets a std of exactly 0, as in pandas.
+    """
+    n = len(values)
+    out = np.full((n, len(lags) + 2 * len(windows)), np.nan, dtype=dtype)
+    bounds = np.append(starts, n)
+
+    for b0, b1 in zip(bounds[:-1], bounds[1:]):
+        x = values[b0:b1]
+        m = len(x)
+        if m == 0:
+            continue
+
+        for j, lag in enumerate(lags):
+            if lag < m:
+                out[b0 + lag:b1, j] = x[:m - lag]
+
+        # Centering keeps the cumulative sums small -> no cancellation in the variance
+        shift = x.mean()
+        xc = x - shift
+        cs = np.concatenate(([0.0], np.cumsum(xc)))
+        cs2 = np.concatenate(([0.0], np.cumsum(xc * xc)))
+
+        # Length of the run of identical values ending at each row
+        pos = np.arange(m)
+        run_start = np.maximum.accumulate(np.where(np.r_[True, x[1:] != x[:-1]], pos, 0))
+        run = pos - run_start + 1
+
+        for k, window in enumerate(windows):
+            if window > m:
+                continue
+            total = cs[window:] - cs[:-window]
+            total_sq = cs2[window:] - cs2[:-window]
+            mean = total / window
+            var = np.maximum(total_sq - total * mean, 0.0) / (window - 1)
+            var[run[window - 1:] >= window] = 0.0
+
+            col = len(lags) + 2 * k
+            out[b0 + window - 1:b1, col] = mean + shift
+            out[b0 + window - 1:b1, col + 1] = np.sqrt(var)
+
+    return out
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    lags: tuple = (1, 3, 6, 12, 24, 48, 168)
+    windows: tuple = (24, 168)
+    calendar: tuple = tuple(CALENDAR_DTYPES)
+    version: int = FEATURE_SPEC_VERSION
+
+    @property
+    def history(self) -> int:
+        """Hours of history (besides the current hour) a single row needs."""
+        return max(max(self.lags), max(self.windows) - 1)
+
+    def lag_rolling_columns(self, target_col: str) -> list:
+        """Column names produced by the kernel, in kernel order."""
+        names = [f"{target_col}_lag_{lag}" for lag in self.lags]
+        for window in self.windows:
+            names += [f"{target_col}_roll_mean_{window}", f"{target_col}_roll_std_{window}"]
+        return names
+
+    def calendar_features(self, timestamps, compact: bool = False) -> pd.DataFrame:
+        """Calendar features of UTC timestamps (positional index)."""
+        ts = pd.DatetimeIndex(timestamps)
+        dayofweek = ts.dayofweek.to_numpy()
+        features = pd.DataFrame({
+            "hour": ts.hour.to_numpy(),
+            "dayofweek": dayofweek,
+            "month": ts.month.to_numpy(),
+            "dayofyear": ts.dayofyear.to_numpy(),
+            "weekofyear": ts.isocalendar().week.to_numpy().astype(int),
+            "is_weekend": np.isin(dayofweek, [5, 6]).astype(int),
+        })[list(self.calendar)]
+        return features.astype({c: CALENDAR_DTYPES[c] for c in self.calendar}) if compact else features
+
+    def batch(self, values: np.ndarray, starts: np.ndarray, dtype=np.float64) -> np.ndarray:
+        """Batch plan: lag/rolling features of every row of the country blocks starting at `starts`."""
+        return lag_rolling_kernel(values, starts, self.lags, self.windows, dtype=dtype)
+
+    def step_plan(self, history: pd.Series, start, steps: int, state: "FeatureState" = None) -> "StepPlan":
+        return StepPlan(self, history, start, steps, state)
+
+
+class FeatureState:
+    """
+    Online lag/rolling state of one (country, target) series.
+
+    A ring buffer holds the last spec.history + 1 hourly values; running sums of
+    the (shifted) values and their squares give every rolling mean/std. push() and
+    replace_last() are O(1); the sums are rebuilt from the buffer once per buffer
+    length to stop floating point drift. features() returns the row of the latest
+    hour in kernel order (NaN where history is still missing), like the batch plan.
+    """
+
+    def __init__(self, spec: FeatureSpec = None, last_time=None):
+        self.spec = spec or FEATURE_SPEC
+        self.size = self.spec.history + 1
+        self.buffer = np.zeros(self.size)
+        self.count = 0          # values pushed so far
+        self.shift = 0.0        # sums are kept over (value - shift) to avoid cancellation
+        self.sums = np.zeros(len(self.spec.windows))
+        self.sums_sq = np.zeros(len(self.spec.windows))
+        self.run = 0            # identical values ending at the latest hour
+        self.prev_run = 0       # ... ending at the hour before
+        self.last_time = None if last_time is None else pd.Timestamp(last_time)
+
+    def _at(self, back: int) -> float:
+        """Value `back` hours before the latest one."""
+        return self.buffer[(self.count - 1 - back) % self.size]
+
+    def _resync(self):
+        filled = min(self.count, self.size)
+        recent = np.array([self._at(back) for back in range(filled)])
+        self.shift = recent[:min(filled, max(self.spec.windows))].mean() if filled else 0.0
+        for k, window in enumerate(self.spec.windows):
+            centered = recent[:min(filled, window)] - self.shift
+            self.sums[k] = centered.sum()
+            self.sums_sq[k] = (centered * centered).sum()
+
+    def push(self, value: float, timestamp=None):
+        """Append the next hour. With timestamps, skipped hours are filled with 0 and a repeated hour replaces the last one."""
+        value = 0.0 if value is None or np.isnan(value) else float(value)
+        if timestamp is not None:
+            timestamp = pd.Timestamp(timestamp)
+            if self.last_time is not None:
+                gap = int((timestamp - self.last_time) / pd.Timedelta(hours=1))
+                if gap == 0:
+                    return self.replace_last(value)
+                if gap < 0:
+                    raise ValueError(f"Out-of-order hour {timestamp} (state is at {self.last_time})")
+                for _ in range(gap - 1):
+                    self.push(0.0)
+            self.last_time = timestamp
+
+        x = value - self.shift
+        for k, window in enumerate(self.spec.windows):
+            self.sums[k] += x
+            self.sums_sq[k] += x * x
+            if self.count >= window:
+                old = self._at(window - 1) - self.shift
+                self.sums[k] -= old
+                self.sums_sq[k] -= old * old
+
+        self.prev_run = self.run
+        self.run = self.run + 1 if self.count and value == self._at(0) else 1
+        self.buffer[self.count % self.size] = value
+        self.count += 1
+        if self.count % self.size == 0:
+            self._resync()
+
+    def replace_last(self, value: float):
+        """Overwrite the latest hour (e.g. a forecast replaced by the actual value, or vice versa)."""
+        if self.count == 0:
+            raise ValueError("No hour to replace yet")
+        value = 0.0 if value is None or np.isnan(value) else float(value)
+        old, new = self._at(0) - self.shift, value - self.shift
+        self.sums += new - old
+        self.sums_sq += new * new - old * old
+        self.buffer[(self.count - 1) % self.size] = value
+        self.run = self.prev_run + 1 if self.count > 1 and value == self._at(1) else 1
+
+    def features(self) -> np.ndarray:
+        out = np.full(len(self.spec.lags) + 2 * len(self.spec.windows), np.nan)
+        for j, lag in enumerate(self.spec.lags):
+            if self.count > lag:
+                out[j] = self._at(lag)
+        for k, window in enumerate(self.spec.windows):
+            if self.count >= window:
+                mean = self.sums[k] / window
+                var = max(self.sums_sq[k] - self.sums[k] * mean, 0.0) / (window - 1)
+                col = len(self.spec.lags) + 2 * k
+                out[col] = mean + self.shift
+                out[col + 1] = 0.0 if self.run >= window else np.sqrt(var)
+        return out
+
+    def copy(self) -> "FeatureState":
+        return FeatureState.from_dict(self.to_dict(), self.spec)
+
+    def to_dict(self) -> dict:
+        return {
+            "lags": list(self.spec.lags), "windows": list(self.spec.windows), "version": self.spec.version,
+            "values": [self._at(back) for back in reversed(range(min(self.count, self.size)))],
+            "count": self.count,
+            "last_time": None if self.last_time is None else self.last_time.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, spec: FeatureSpec = None) -> "FeatureState":
+        spec = spec or FEATURE_SPEC
+        if (data["lags"], data["windows"], data["version"]) != (list(spec.lags), list(spec.windows), spec.version):
+            raise ValueError("Feature state was saved for a different feature spec")
+        state = cls(spec)
+        # Only the last `size` values are stored; the count decides which lags/windows are complete
+        state.count = data["count"]
+        first = state.count - len(data["values"])
+        for j, value in enumerate(data["values"]):
+            state.buffer[(first + j) % state.size] = value
+        state._rebuild_runs()
+        state._resync()
+        state.last_time = None if data["last_time"] is None else pd.Timestamp(data["last_time"])
+        return state
+
+    def _rebuild_runs(self):
+        filled = min(self.count, self.size)
+        self.run = self.prev_run = 0
+        for back in range(filled):
+            if back and self._at(back) != self._at(0):
+                break
+            self.run += 1
+        for back in range(1, filled):
+            if back > 1 and self._at(back) != self._at(1):
+                break
+            self.prev_run += 1
+
+    @classmethod
+    def from_history(cls, history: pd.Series, end, spec: FeatureSpec = None) -> "FeatureState":
+        """State after the hour before `end`, built from the last spec.history + 1 hours of history."""
+        spec = spec or FEATURE_SPEC
+        end = pd.Timestamp(end)
+        grid = pd.date_range(end - pd.Timedelta(hours=spec.history + 1), periods=spec.history + 1, freq="h")
+        history = history[~history.index.duplicated(keep="first")]
+        state = cls(spec)
+        for value in history.reindex(grid).fillna(0.0).to_numpy(dtype=np.float64):
+            state.push(value)
+        state.last_time = grid[-1]
+        return state
+
+
+def save_feature_states(states: dict, path: Path):
+    """Persist {(country, target): FeatureState}; written via temp file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {f"{country}|{target}": state.to_dict() for (country, target), state in states.items()}
+    tmp_file = path.with_suffix(".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_file, path)
+
+
+def load_feature_states(path: Path, spec: FeatureSpec = None) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {tuple(name.split("|", 1)): FeatureState.from_dict(state, spec) for name, state in data.items()}
+
+
+def serving_window(forecast_date=None) -> tuple:
+    """
+    (real_start, lookup_start) of the serving paths: midnight (UTC) of the forecast
+    day, where the 24h window of both services starts, and the same hour one year
+    back, whose history feeds the XGBoost lags.
+    """
+    if forecast_date is None:
+        real_start = pd.Timestamp.now(tz="UTC").normalize()
+    else:
+        real_start = pd.Timestamp(forecast_date, tz="UTC").normalize()
+    return real_start, real_start - pd.DateOffset(years=1)
+
+
+class StepPlan:
+    """
+    Serving plan for a recursive forecast of `steps` hours from `start`.
+
+    Keeps a FeatureState of the hours before `start` (built from history, or a
+    copy of a given state). features(i) appends the step's history value and
+    returns the row for that hour; update(i, value) replaces it with the
+    prediction so later steps see it in their lags and rolling stats. O(1) per step.
+    """
+
+    def __init__(self, spec: FeatureSpec, history: pd.Series, start, steps: int, state: FeatureState = None):
+        start = pd.Timestamp(start)
+        self.state = state.copy() if state is not None else FeatureState.from_history(history, start, spec)
+        grid = pd.date_range(start, periods=steps, freq="h")
+        history = history[~history.index.duplicated(keep="first")]
+        self.values = history.reindex(grid).fillna(0.0).to_numpy(dtype=np.float64)
+        self._pushed = -1
+
+    def features(self, i: int) -> np.ndarray:
+        if i != self._pushed:
+            if i != self._pushed + 1:
+                raise ValueError(f"Steps must be taken in order (expected {self._pushed + 1}, got {i})")
+            self.state.push(self.values[i])
+            self._pushed = i
+        return self.state.features()
+
+    def update(self, i: int, value: float):
+        if i != self._pushed:
+            raise ValueError(f"Step {i} has not been taken yet")
+        self.state.replace_last(value)
+
+
+FEATURE_SPEC = FeatureSpec()
+
+
+def parity_check(df: pd.DataFrame, target_col: str, country: str, n_rows: int = 48,
+                 spec: FeatureSpec = FEATURE_SPEC, rtol: float = 1e-7) -> float:
+    """
+    Compare the batch plan with the step plan on the last n_rows hours of one
+    country's series; returns the largest absolute difference (raises if above tolerance).
+    Rows without full history are NaN in the batch plan and 0-padded in the step plan,
+    so the series should be longer than spec.history + n_rows.
+    """
+    series = (df.loc[df["Country"] == country].set_index("datetime_utc")[target_col]
+              .sort_index().fillna(0.0).asfreq("h", fill_value=0.0))
+    batch = spec.batch(series.to_numpy(dtype=np.float64), np.zeros(1, dtype=np.int64))[-n_rows:]
+
+    plan = spec.step_plan(series, series.index[-n_rows], n_rows)
+    step = np.vstack([plan.features(i) for i in range(n_rows)])
+
+    np.testing.assert_allclose(step, batch, rtol=rtol, atol=1e-6 * max(1.0, np.nanmax(np.abs(batch))))
+    return float(np.nanmax(np.abs(step - batch)))
+
+
+def _assert_features_close(actual: np.ndarray, expected: np.ndarray, rtol: float, atol: float, what: str):
+    if not np.array_equal(np.isnan(actual), np.isnan(expected)):
+        raise AssertionError(f"{what}: plans disagree on which features lack history")
+    np.testing.assert_allclose(actual, expected, rtol=rtol, atol=atol, err_msg=what)
+
+
+def synthetic_parity_check(spec: FeatureSpec = FEATURE_SPEC, n_rows: int = 48, rtol: float = 1e-7) -> int:
+    """
+    Self-contained parity check on a small synthetic raw frame (no raw store needed).
+
+    For every (country, target) series it checks the step plan against the batch
+    plan (parity_check), and a FeatureState fed hour by hour against every row of the
+    batch plan: hours are pushed with timestamps (dropped rows are gap-filled), some
+    are pushed wrong first and corrected via push() of the same hour or replace_last(),
+    and the state goes through a to_dict()/from_dict() JSON round trip on the way.
+    A run of identical values exercises the exact-zero rolling std. Returns the number
+    of series checked; raises AssertionError on any mismatch.
+    """
+    from src.benchmarks.synthetic import synthetic_raw_frame
+
+    countries = ["AT", "DE", "FR"]
+    df = synthetic_raw_frame(years=0.06, countries=countries, missing_ratio=0.02)
+    # A flat stretch longer than every window (e.g. an outage reported as 0); the state's
+    # JSON round trip happens inside it, so the run lengths have to survive it too
+    flat_start, round_trip, flat_end = df["datetime_utc"].iloc[[300, 400, 500]]
+    df.loc[(df["Country"] == "DE") & df["datetime_utc"].between(flat_start, flat_end), "Wind Onshore"] = 0.0
+    targets = ["Solar", "Wind Onshore", "Wind Offshore"]
+
+    checked = 0
+    for target in targets:
+        for country in countries:
+            parity_check(df, target, country, n_rows=n_rows, spec=spec, rtol=rtol)
+
+            series = (df.loc[df["Country"] == country].set_index("datetime_utc")[target]
+                      .sort_index().fillna(0.0).asfreq("h", fill_value=0.0))
+            batch = spec.batch(series.to_numpy(dtype=np.float64), np.zeros(1, dtype=np.int64))
+            atol = 1e-6 * max(1.0, series.abs().max())
+
+            # Rows that are 0 are dropped from the input: the state has to gap-fill them itself
+            observed = series[(series != 0.0) | (np.arange(len(series)) % 5 == 0)]
+            rows = series.index.get_indexer(observed.index)
+            state, restored = FeatureState(spec), False
+            for j, (row, (timestamp, value)) in enumerate(zip(rows, observed.items())):
+                if not restored and timestamp >= round_trip:
+                    copy = FeatureState.from_dict(json.loads(json.dumps(state.to_dict())), spec)
+                    # Run lengths are only rebuilt as far back as the buffer goes, which covers every window
+                    runs = lambda st: (min(st.run, st.size), min(st.prev_run, st.size - 1), st.last_time)
+                    if runs(copy) != runs(state):
+                        raise AssertionError(f"{country} {target}: state changed in the to_dict/from_dict round trip")
+                    state, restored = copy, True
+                if j % 7 == 0:
+                    state.push(value + 1.0, timestamp)
+                    state.push(value, timestamp)          # same hour again -> replaces it
+                elif j % 7 == 3:
+                    state.push(-value, timestamp)
+                    state.replace_last(value)
+                else:
+                    state.push(value, timestamp)
+                _assert_features_close(state.features(), batch[row], rtol, atol,
+                                       f"{country} {target} state at {timestamp}")
+            checked += 1
+    return checked
+
+
+if __name__ == "__main__":
+    n_series = synthetic_parity_check()
+    print(f"✅ Synthetic data: batch/step/online-state parity on {n_series} series")
+
+    from config import RAW_STORE_DIR
+    from src.storage.raw_store import read_raw
+
+    if not RAW_STORE_DIR.exists():
+        print("ℹ️ Raw data store not found, skipping the check on real data.")
+        sys.exit(0)
+    raw_df = read_raw()
+    for target in ["Solar", "Wind Onshore", "Wind Offshore"]:
+        for country in sorted(raw_df["Country"].unique()):
+            diff = parity_check(raw_df, target, country)
+            print(f"✅ {country} {target}: batch/step max diff {diff:.2e}")
@@ -1,9 +1,15 @@
 import os
 import sys
+import json
 import time
+import argparse
+import random
+import threading
+import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from entsoe.entsoe import EntsoePandasClient
-from entsoe.exceptions import NoMatchingDataError
+from entsoe.exceptions import NoMatchingDataError, InvalidPSRTypeError
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -11,12 +17,64 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(PROJECT_ROOT))
 
-from config import PROJECT_ROOT, DATA_FILE_RAW, TARGET_COUNTRIES, TARGET_COLS, START_DATE, END_DATE
+from config import (
+    PROJECT_ROOT, RAW_STORE_DIR, INGEST_STATE_FILE, INGEST_STRATEGY_FILE, INGEST_CHECKPOINT_DIR, ENTSOE_CACHE_DIR, TARGET_COUNTRIES, TARGET_COLS,
+    START_DATE, END_DATE, ENTSOE_REQUESTS_PER_MINUTE, ENTSOE_MAX_WORKERS, ENTSOE_MAX_RETRIES, INGEST_WINDOW_FREQ
+)
+from src.storage.raw_store import RawStoreWriter
+from src.training_phase.entsoe_cache import CachedEntsoeClient
+from src.training_phase.validate_data import validate_raw_store, DataValidationError
+
+# Network hiccups and HTTP 429/5xx responses are worth retrying; anything else
+# (no data, unsupported PSR type, parse errors, 4xx like a bad API key) will fail again and only burns quota
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError, TimeoutError)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is not None and (status == 429 or status >= 500)
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class IngestionError(RuntimeError):
+    """Raised when download windows failed; their country is not published and resumes on the next run."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all fetch workers.
+    Every ENTSO-E request takes one token, so the combined request rate stays
+    below the API quota no matter how many countries are fetched in parallel.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int = 10):
+        self.rate = rate_per_minute / 60.0  # tokens per second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
 
 class EnergyDataLoader:
     """
     Component responsible for extracting energy generation data from Entsoe,
-    transforming it into a standardized format, and save it as csv.
+    transforming it into a standardized format, and save it to the partitioned raw store.
     """
     
     # Constant mapping for API codes
@@ -26,11 +84,55 @@ class EnergyDataLoader:
         'Wind Offshore': 'B18'
     }
 
-    def __init__(self, config_path: Path):
+    def __init__(self, config_path: Path, client=None, requests_per_minute: float = ENTSOE_REQUESTS_PER_MINUTE,
+                 max_retries: int = ENTSOE_MAX_RETRIES, backoff_base: float = 2.0, state_file: Path = INGEST_STATE_FILE,
+                 window_freq: str = INGEST_WINDOW_FREQ, checkpoint_dir: Path = INGEST_CHECKPOINT_DIR,
+                 strategy_file: Path = INGEST_STRATEGY_FILE, cache_mode: str = "off",
+                 cache_dir: Path = ENTSOE_CACHE_DIR, fixture_dir: Path | None = None):
+            """
+            cache_mode: "off"       - query ENTSO-E directly
+                        "readwrite" - serve repeated queries from the on-disk response cache
+                        "replay"    - offline: serve only from cache_dir/fixture_dir, never call the API
+            """
             self.project_root = config_path
-            self.api_key = self._get_api_key()
-            self.client = EntsoePandasClient(api_key=self.api_key)
-            self.data_buffer = []
+            self.state_file = state_file
+            self.strategy_file = strategy_file
+            self.window_freq = window_freq
+            self.checkpoint_dir = checkpoint_dir
+
+            # A pre-built client (e.g. a local stand-in for benchmarks) skips the API key lookup,
+            # and so does replay mode, which never talks to the API
+            if client is None and cache_mode != "replay":
+                self.api_key = self._get_api_key()
+                client = EntsoePandasClient(api_key=self.api_key)
+
+            if cache_mode == "off":
+                self.cache = None
+                self.client = client
+            elif cache_mode in ("readwrite", "replay"):
+                self.cache = CachedEntsoeClient(client, cache_dir, replay=cache_mode == "replay",
+                                                fixture_dir=fixture_dir)
+                self.client = self.cache
+            else:
+                raise ValueError(f"❌ Unknown cache_mode '{cache_mode}' (expected off, readwrite or replay)")
+
+            self.rate_limiter = TokenBucket(requests_per_minute)
+            self.max_retries = max_retries
+            self.backoff_base = backoff_base
+            self.writer = None
+            self.timings = {}
+            self.failed = {}     # country -> failed windows / error of the current run
+            self.completed = []  # countries whose block was staged in full
+            self.high_water_marks = self._read_json(self.state_file)
+            self.pending_marks = {}  # marks of staged blocks, applied once they are published
+
+            # Memoized {country: {"strategy": "bulk"|"targeted", "psr_types": [...]}}
+            # psr_types leaves out types known to be missing: no data in any window of a full run
+            self.strategies = self._read_json(self.strategy_file)
+            self.state_lock = threading.Lock()
+            self.strategy_stats = {"hits": 0, "misses": 0, "stale": 0}
+            self.psr_found = {}     # country -> PSR types with data in this run
+            self.psr_probed = set()  # countries whose skipped PSR types were re-probed this run
 
     def _get_api_key(self) -> str:  # Added return type hint
         """Load and return API key from environment variables."""
@@ -42,6 +144,82 @@ class EnergyDataLoader:
             
         return key
 
+    def _read_json(self, path: Path) -> dict:
+            """Load persisted loader state (high-water marks, strategies) of previous runs."""
+            if not path.exists():
+                return {}
+            with open(path) as f:
+                return json.load(f)
+
+    def _write_json(self, path: Path, data: dict):
+            """Persist loader state; written via temp file so a crash never leaves half a JSON."""
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = path.with_suffix(".tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, path)
+
+    def _update_high_water_marks(self, df: pd.DataFrame, before: pd.Timestamp | None = None,
+                                 target: dict | None = None):
+            """
+            Advance the last-ingested timestamp for every (country, PSR type) present in df,
+            in `target` (the stored marks by default).
+            Only rows before `before` (the first window that returned no data) count, so a gap
+            in the middle of the range is fetched again by the next incremental run.
+            """
+            target = self.high_water_marks if target is None else target
+            if before is not None:
+                df = df[df["datetime_utc"] < before]
+            for country, group in df.groupby("Country"):
+                marks = target.setdefault(country, {})
+                for psr_name in self.PSR_MAP:
+                    if psr_name not in group.columns:
+                        continue
+                    valid = group.loc[group[psr_name].notna(), "datetime_utc"]
+                    if valid.empty:
+                        continue
+                    latest = valid.max()
+                    if psr_name not in marks or latest > pd.Timestamp(marks[psr_name]):
+                        marks[psr_name] = latest.isoformat()
+
+    def _incremental_start(self, country: str, start: pd.Timestamp) -> pd.Timestamp:
+            """
+            First timestamp that still has to be fetched for a country.
+            Restarts AT the oldest high-water mark (not after it) so a partially
+            published last hour gets refreshed; the merge de-duplicates it.
+            """
+            marks = self.high_water_marks.get(country)
+            if not marks:
+                return start
+            oldest_mark = min(pd.Timestamp(ts) for ts in marks.values())
+            return max(start, oldest_mark)
+
+    def _split_windows(self, start: pd.Timestamp, end: pd.Timestamp) -> list:
+            """
+            Split [start, end) into consecutive windows aligned to self.window_freq.
+            Edges are generated from midnight of start's day, so a start at e.g. 23:00
+            still splits on calendar boundaries and checkpoint names line up between runs.
+            """
+            edges = pd.date_range(start.normalize(), end, freq=self.window_freq)
+            edges = sorted({start, end, *edges[(edges > start) & (edges < end)]})
+            return list(zip(edges[:-1], edges[1:]))
+
+    def _checkpoint_path(self, country: str, start: pd.Timestamp, end: pd.Timestamp) -> Path:
+            return self.checkpoint_dir / f"{country}_{start:%Y%m%dT%H%M}_{end:%Y%m%dT%H%M}.parquet"
+
+    def _write_checkpoint(self, df: pd.DataFrame, path: Path):
+            """Write a finished window atomically, so a crash mid-write never looks 'done'."""
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            df.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+
+    def _clear_checkpoints(self, countries: list):
+            """Checkpoints are only needed until the country's output has been saved."""
+            for country in countries:
+                for path in self.checkpoint_dir.glob(f"{country}_*.parquet"):
+                    path.unlink()
+
     def _clean_dataframe(self, df: pd.DataFrame, country_code: str) -> pd.DataFrame:
             """Helper to standardize any dataframe chunk (1h resampling, formatting)."""
             # 1. Handle MultiIndex columns
@@ -58,6 +236,22 @@ class EnergyDataLoader:
             df["Country"] = country_code
             return df
 
+    def _query(self, country: str, start: pd.Timestamp, end: pd.Timestamp, psr_type: str | None = None) -> pd.DataFrame:
+            """Rate-limited ENTSO-E query with exponential backoff on transient errors."""
+            for attempt in range(self.max_retries + 1):
+                # Cached responses don't touch the API, so they don't count against the quota
+                if self.cache is None or not self.cache.contains(country, start, end, psr_type):
+                    self.rate_limiter.acquire()
+                try:
+                    return self.client.query_generation(country, start=start, end=end, psr_type=psr_type)
+                except Exception as e:
+                    if not _is_retryable(e) or attempt == self.max_retries:
+                        raise
+                    delay = self.backoff_base * 2 ** attempt
+                    delay += random.uniform(0, delay)  # jitter so workers don't retry in lockstep
+                    print(f"\n  🔁 {country}: retry {attempt + 1}/{self.max_retries} in {delay:.1f}s ({e})")
+                    time.sleep(delay)
+
 # ----------------------------------------------------------------------------------------------------------
 # Because data for each country are slightly different in format and frequency, two approaches are needed
 # bulk: download everything, extract needed columns afterwards
@@ -66,7 +260,7 @@ class EnergyDataLoader:
     def _fetch_strategy_bulk(self, country: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame | None:
             """Strategy A: Attempt to download all generation types at once."""
             print("  Attempting bulk download...", end=" ")
-            df = self.client.query_generation(country, start=start, end=end, psr_type=None)
+            df = self._query(country, start, end, psr_type=None)
             df = self._clean_dataframe(df, country)
             
             # Filter for only the columns we care about
@@ -79,13 +273,20 @@ class EnergyDataLoader:
             print("✅ Success (Bulk)")
             return df[cols_to_keep + ['Country']]
 
-    def _fetch_strategy_targeted(self, country: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame | None:
-            """Strategy B: Fallback - Fetch Solar/Wind separately and merge."""
+    def _fetch_strategy_targeted(self, country: str, start: pd.Timestamp, end: pd.Timestamp,
+                                 psr_types: list | None = None) -> pd.DataFrame | None:
+            """
+            Strategy B: Fallback - Fetch Solar/Wind separately and merge (optionally only the given types).
+            A type without data is skipped; any other error (e.g. retries exhausted) is raised,
+            so a window is never published with a type silently missing.
+            """
             country_parts = []
+            psr_types = psr_types if psr_types is not None else list(self.PSR_MAP)
             
-            for friendly_name, psr_code in self.PSR_MAP.items():
+            for friendly_name in psr_types:
+                psr_code = self.PSR_MAP[friendly_name]
                 try:
-                    part_df = self.client.query_generation(country, start=start, end=end, psr_type=psr_code)
+                    part_df = self._query(country, start, end, psr_type=psr_code)
                     part_df = self._clean_dataframe(part_df, country)
                     
                     # Rename the single data column to friendly name
@@ -93,7 +294,7 @@ class EnergyDataLoader:
                     part_df = part_df.rename(columns={data_col: friendly_name})
                     
                     country_parts.append(part_df[[friendly_name]])
-                except (NoMatchingDataError, Exception):
+                except (NoMatchingDataError, InvalidPSRTypeError):
                     pass # Specific type not found for this country
 
             if country_parts:
@@ -106,71 +307,307 @@ class EnergyDataLoader:
             print("  ❌ Failed completely.")
             return None
 
-    def fetch_country_data(self, country: str, start: pd.Timestamp, end: pd.Timestamp):
-            """Orchestrates the fetching logic for a single country."""
-            print(f"\n🌍 Processing {country}...", end=" ")
-            
-            try:
-                # Try Strategy A
-                df = self._fetch_strategy_bulk(country, start, end)
-                if df is not None:
-                    self.data_buffer.append(df)
-                    return
-            except Exception as e:
-                print(f"⚠️ Bulk failed ({str(e)}). Switching to specific queries...")
+    def _discover_window(self, country: str, start: pd.Timestamp, end: pd.Timestamp, skip_bulk: bool = False) -> tuple:
+            """
+            Runs the full bulk -> targeted strategy chain. Returns (df, strategy name).
+            skip_bulk starts at the targeted strategy (bulk already failed for this window).
+            """
+            if not skip_bulk:
+                try:
+                    # Try Strategy A
+                    df = self._fetch_strategy_bulk(country, start, end)
+                    if df is not None:
+                        return df, "bulk"
+                except Exception as e:
+                    print(f"⚠️ Bulk failed ({str(e)}). Switching to specific queries...")
 
             # Fallback to Strategy B
-            df = self._fetch_strategy_targeted(country, start, end)
+            return self._fetch_strategy_targeted(country, start, end), "targeted"
+
+    def _fetch_window(self, country: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame | None:
+            """
+            Fetches one download window. If a strategy already worked for this country,
+            go straight to it (skipping PSR types known to be missing); otherwise, or if
+            the memoized strategy stops working, rediscover it and remember the result
+            (a failed memoized bulk goes straight to the targeted queries).
+            """
+            known = self.strategies.get(country)
+
+            if known is not None:
+                if known["strategy"] == "bulk":
+                    try:
+                        df = self._fetch_strategy_bulk(country, start, end)
+                    except Exception as e:
+                        print(f"⚠️ Memoized bulk failed ({str(e)}).", end=" ")
+                        df = None
+                else:
+                    df = self._fetch_strategy_targeted(country, start, end, psr_types=self._psr_types_to_fetch(country, known))
+
+                if df is not None:
+                    with self.state_lock:
+                        self.strategy_stats["hits"] += 1
+                    return df
+
+                print(f"  🔄 {country}: memoized '{known['strategy']}' strategy stopped working, rediscovering...")
+                with self.state_lock:
+                    self.strategy_stats["stale"] += 1
+            else:
+                with self.state_lock:
+                    self.strategy_stats["misses"] += 1
+
+            # A failed memoized bulk is not requested a second time for the same window
+            skip_bulk = known is not None and known["strategy"] == "bulk"
+            df, strategy = self._discover_window(country, start, end, skip_bulk=skip_bulk)
             if df is not None:
-                self.data_buffer.append(df)
-            
-            time.sleep(1) # Respect API limits
+                # Nothing is known to be missing yet; types are only dropped at the end of a full run
+                with self.state_lock:
+                    self.strategies[country] = {"strategy": strategy, "psr_types": list(self.PSR_MAP)}
+            return df
 
-    def save_data(self, output_file: Path):
-            """Finalizes the dataset and saves to CSV."""
-            if not self.data_buffer:
-                print("❌ No data collected.")
+    def _psr_types_to_fetch(self, country: str, known: dict) -> list:
+            """
+            PSR types a memoized targeted fetch requests: the known ones plus those found
+            earlier in this run. The country's first window of every run probes all types,
+            so a type that starts reporting later (e.g. new offshore wind) is picked up again.
+            """
+            with self.state_lock:
+                if country not in self.psr_probed:
+                    self.psr_probed.add(country)
+                    return list(self.PSR_MAP)
+                found = self.psr_found.get(country, set())
+            return [t for t in self.PSR_MAP if t in known["psr_types"] or t in found]
+
+    def _record_psr_types(self, country: str, df: pd.DataFrame):
+            """Remember which PSR types had data in a window of this run (fetched or from a checkpoint)."""
+            found = {c for c in self.PSR_MAP if c in df.columns and df[c].notna().any()}
+            with self.state_lock:
+                self.psr_found.setdefault(country, set()).update(found)
+
+    def _narrow_psr_types(self):
+            """
+            After a run: a PSR type of a country counts as missing only if none of the
+            run's windows had data for it. Countries with failed windows, or without any
+            data this run, keep what was known before.
+            """
+            for country in self.completed:
+                found = self.psr_found.get(country)
+                if found and country in self.strategies:
+                    self.strategies[country]["psr_types"] = [t for t in self.PSR_MAP if t in found]
+
+    def fetch_country_data(self, country: str, start: pd.Timestamp, end: pd.Timestamp):
+            """
+            Orchestrates the fetching logic for a single country.
+            The range is downloaded window by window; every finished window is
+            checkpointed, and windows with an existing checkpoint are not downloaded again.
+            If a window fails, the remaining windows are still fetched (and checkpointed),
+            but the country is not staged: it is recorded in self.failed and resumes from
+            its checkpoints on the next run.
+            """
+            print(f"\n🌍 Processing {country}...", end=" ")
+            t0 = time.perf_counter()
+            country_parts = []
+            failed_windows = []
+            first_gap = None  # start of the first window without data
+
+            for window_start, window_end in self._split_windows(start, end):
+                checkpoint = self._checkpoint_path(country, window_start, window_end)
+
+                if checkpoint.exists():
+                    print(f"\n  ⏭️  {country} {window_start.date()} → {window_end.date()} (checkpoint)", end=" ")
+                    df = pd.read_parquet(checkpoint)
+                else:
+                    try:
+                        df = self._fetch_window(country, window_start, window_end)
+                    except Exception as e:
+                        print(f"\n  ❌ {country} {window_start} → {window_end} failed: {e}")
+                        failed_windows.append(f"{window_start} → {window_end}: {e}")
+                        continue
+                    if df is None:
+                        first_gap = window_start if first_gap is None else first_gap
+                        continue
+                    self._write_checkpoint(df, checkpoint)
+
+                self._record_psr_types(country, df)
+                country_parts.append(df)
+
+            self.timings[country] = time.perf_counter() - t0
+            if failed_windows:
+                with self.state_lock:
+                    self.failed[country] = failed_windows
                 return
 
-            print("\n📦 Combining and Saving...")
-            final_df = pd.concat(self.data_buffer)
+            # Stream this country's block to the store right away instead of buffering every country
+            if country_parts:
+                country_df = self._to_records(pd.concat(country_parts))
+                self.writer.append(country_df)
+                with self.state_lock:
+                    self._update_high_water_marks(country_df, before=first_gap, target=self.pending_marks)
+            with self.state_lock:
+                self.completed.append(country)
 
+    def _to_records(self, df: pd.DataFrame) -> pd.DataFrame:
+            """Turns a timestamp-indexed country block into raw store rows."""
             # Standardization
-            final_df.index = pd.to_datetime(final_df.index, utc=True)
-            final_df = final_df.reset_index()
-            final_df = final_df.rename(columns={final_df.columns[0]: 'datetime_utc'})
+            df.index = pd.to_datetime(df.index, utc=True)
+            df = df.reset_index()
+            df = df.rename(columns={df.columns[0]: 'datetime_utc'})
 
             # Reorder columns safely
             desired_cols = ['datetime_utc', 'Country', 'Solar', 'Wind Onshore', 'Wind Offshore']
-            existing_cols = [c for c in desired_cols if c in final_df.columns]
-            final_df = final_df[existing_cols]
+            existing_cols = [c for c in desired_cols if c in df.columns]
+            return df[existing_cols]
+
+    def save_data(self, validate: bool = True, reference_time: pd.Timestamp | None = None):
+            """
+            Finalizes the dataset: publishes every staged country partition to the raw store.
+            In incremental mode the staged partitions already contain the merged existing rows,
+            newer rows winning on duplicate (datetime_utc, Country) keys.
+            With validate=True the staged partitions go through the quality gates first; on a
+            violation nothing is published, the high-water marks stay where they were and the
+            DataValidationError is raised.
+            Failed countries were never staged, so their checkpoints are kept for the next run.
+            """
+            if not self.writer.staged:
+                print("❌ No data collected.")
+                self.writer.abort()
+                self._clear_checkpoints(self.completed)
+                return
+
+            if validate:
+                try:
+                    validate_raw_store(root=self.writer.staging_dir, reference_time=reference_time)
+                except DataValidationError:
+                    print("❌ Staged data failed the quality gates, nothing was published.")
+                    self.writer.abort()
+                    # The checkpoints hold the rejected data, so the next run downloads it again
+                    self._clear_checkpoints(self.completed)
+                    raise
+
+            print("\n📦 Publishing staged partitions...")
+            written = self.writer.finalize()
+            print(f"✅ DONE! Saved {len(written)} partitions to: {self.writer.root}")
+
+            # Only persist the high-water marks once the data is safely on disk
+            for country, marks in self.pending_marks.items():
+                stored = self.high_water_marks.setdefault(country, {})
+                for psr_name, mark in marks.items():
+                    if psr_name not in stored or pd.Timestamp(mark) > pd.Timestamp(stored[psr_name]):
+                        stored[psr_name] = mark
+            self._write_json(self.state_file, self.high_water_marks)
+            self._clear_checkpoints(self.completed)
+
+    def _print_timing_summary(self, wall_time: float, workers: int):
+            """Reports per-country fetch times and the speedup over a sequential run."""
+            print(f"\n⏱️  Timing Summary ({workers} worker{'s' if workers > 1 else ''})")
+            for country, seconds in sorted(self.timings.items(), key=lambda kv: kv[1], reverse=True):
+                print(f"   {country:<4} {seconds:8.2f}s")
+
+            sequential_time = sum(self.timings.values())
+            speedup = sequential_time / wall_time if wall_time > 0 else 0.0
+            print(f"   Wall-clock: {wall_time:.2f}s | Sum of countries: {sequential_time:.2f}s | Speedup: {speedup:.1f}x")
 
-            # Ensure directory exists
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            final_df.to_csv(output_file, index=False)
-            print(f"✅ DONE! Saved to: {output_file}")
+            stats = self.strategy_stats
+            print(f"   Strategy cache: {stats['hits']} hits | {stats['misses']} misses | {stats['stale']} stale")
+            if self.cache is not None:
+                stats = self.cache.stats
+                print(f"   Response cache: {stats['hits']} hits | {stats['misses']} misses")
 
-    def run_pipeline(self, countries: list, start_date: str, end_date: str, output_path: Path):
-            """Public entry point to run the full ingestion process."""
+    def run_pipeline(self, countries: list, start_date: str, end_date: str, output_path: Path, workers: int = 1,
+                     incremental: bool = False, validate: bool = True):
+            """
+            Public entry point to run the full ingestion process.
+            With workers > 1, countries are fetched concurrently by a bounded thread pool;
+            the shared token bucket keeps the total request rate within ENTSO-E quotas.
+            With incremental=True, each country is only fetched from its high-water mark onwards.
+            With validate=True, the staged data is checked against the quality gates before it is
+            published; on violations nothing is published and a DataValidationError is raised,
+            blocking downstream processing.
+            Countries with failed download windows are left out (nothing of them is published
+            and their checkpoints are kept); an IngestionError listing them is raised at the end.
+            """
             start = pd.Timestamp(start_date, tz="UTC")
             end = pd.Timestamp(end_date, tz="UTC")
-            out_file = self.project_root / output_path
+            out_dir = self.project_root / output_path
 
-            print(f"🚀 Starting Hybrid Ingestion ({start.date()} to {end.date()})")
+            print(f"🚀 Starting {'Incremental' if incremental else 'Hybrid'} Ingestion ({start.date()} to {end.date()})")
+            self.writer = RawStoreWriter(out_dir, merge=incremental)
+            self.timings = {}
+            self.failed, self.completed, self.pending_marks = {}, [], {}
+            self.strategy_stats = {"hits": 0, "misses": 0, "stale": 0}
+            self.psr_found, self.psr_probed = {}, set()
+            wall_start = time.perf_counter()
 
+            # Work out where each country has to start
+            country_starts = {}
             for country in countries:
-                self.fetch_country_data(country, start, end)
-                
-            self.save_data(out_file)
+                country_start = self._incremental_start(country, start) if incremental else start
+                if country_start >= end:
+                    print(f"   ⏭️  {country} is up to date (last ingested {country_start})")
+                    continue
+                country_starts[country] = country_start
+
+            try:
+                if workers <= 1:
+                    for country, country_start in country_starts.items():
+                        try:
+                            self.fetch_country_data(country, country_start, end)
+                        except Exception as e:
+                            print(f"\n❌ {country} failed: {e}")
+                            self.failed[country] = [str(e)]
+                else:
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        futures = {pool.submit(self.fetch_country_data, c, s, end): c for c, s in country_starts.items()}
+                        for future in as_completed(futures):
+                            try:
+                                future.result()
+                            except Exception as e:
+                                print(f"\n❌ {futures[future]} failed: {e}")
+                                with self.state_lock:
+                                    self.failed[futures[future]] = [str(e)]
+            except BaseException:
+                # Nothing is published on a crash; finished windows survive as checkpoints
+                self.writer.abort()
+                raise
+
+            self._print_timing_summary(time.perf_counter() - wall_start, workers)
+            # Strategies are valid knowledge even if saving fails, so persist them right away
+            self._narrow_psr_types()
+            self._write_json(self.strategy_file, self.strategies)
+            self.save_data(validate=validate, reference_time=end)
+
+            if self.failed:
+                raise IngestionError(
+                    f"{len(self.failed)} countries not published, rerun to resume them: "
+                    + "; ".join(f"{c} ({len(w)} failed)" for c, w in sorted(self.failed.items()))
+                )
 
 # --- Usage Example---
 if __name__ == "__main__":
-    
+    parser = argparse.ArgumentParser(description="Download generation data from ENTSO-E")
+    parser.add_argument("--workers", type=int, default=ENTSOE_MAX_WORKERS, help="Countries fetched in parallel")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch data newer than the last run (up to the current hour)")
+    parser.add_argument("--window", default=INGEST_WINDOW_FREQ,
+                        help="Download window size as pandas offset alias (e.g. MS, W, 7D)")
+    parser.add_argument("--cache", choices=["off", "readwrite", "replay"], default="off",
+                        help="Response cache mode; 'replay' runs fully offline from the cache/fixtures")
+    parser.add_argument("--fixtures", type=Path, default=None,
+                        help="Read-only directory of cached responses used in addition to the cache")
+    parser.add_argument("--skip-validation", action="store_true", help="Don't run the data quality gates")
+    args = parser.parse_args()
+
+    # Incremental refreshes run up to "now"; full runs use the configured range
+    end_date = pd.Timestamp.now(tz="UTC").floor("h").isoformat() if args.incremental else END_DATE
+
     # Instantiate and Run
-    loader = EnergyDataLoader(config_path=PROJECT_ROOT)
+    loader = EnergyDataLoader(config_path=PROJECT_ROOT, window_freq=args.window,
+                              cache_mode=args.cache, fixture_dir=args.fixtures)
     loader.run_pipeline(
         countries=TARGET_COUNTRIES,     #all imported from config
         start_date=START_DATE, 
-        end_date=END_DATE, 
-        output_path=DATA_FILE_RAW
+        end_date=end_date, 
+        output_path=RAW_STORE_DIR,
+        workers=args.workers,
+        incremental=args.incremental,
+        validate=not args.skip_validation
     )
\ No newline at end of file
@@ -1,9 +1,12 @@
+import sys
+import argparse
 import pandas as pd
 from pathlib import Path
+import xgboost as xgb
 from xgboost import XGBRegressor
 import joblib
 from sklearn.metrics import mean_absolute_error
-from feature_engineering import build_features_dataframe
+from feature_engineering import build_features_multi, build_features_chunked, FEATURE_SPEC_VERSION
 from codecarbon import EmissionsTracker
 
 
@@ -11,7 +14,12 @@ from codecarbon import EmissionsTracker
 # CONFIG
 # ============================================================
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
-DATA_FILE = PROJECT_ROOT / "data" / "01_raw" / "generation_2024_raw.csv"
+sys.path.append(str(PROJECT_ROOT))
+
+from config import RAW_STORE_DIR
+from src.storage.raw_store import read_raw, raw_store_fingerprint
+from src.storage.feature_store import FeatureStore
+
 MODEL_DIR = PROJECT_ROOT / "models"
 METRICS_DIR = PROJECT_ROOT / "data" / "04_metrics"
 CARBON_DIR = PROJECT_ROOT / "data" / "05_carbon"
@@ -36,9 +44,63 @@ XGB_PARAMS = dict(
     tree_method="hist",
     n_jobs=-1,
     random_state=42,
+    # Lets the compact feature matrix pass country as one categorical column
+    enable_categorical=True,
 )
 
-def main():
+class FeatureChunkIter(xgb.DataIter):
+    """
+    Feeds a feature store entry to XGBoost one Parquet row group at a time, keeping
+    only the rows whose timestamps pass `select`. A QuantileDMatrix built from it
+    holds the quantized features only; the entry is never loaded as a whole.
+    """
+
+    def __init__(self, store: FeatureStore, target: str, key: str, select=None):
+        self.store, self.target, self.key, self.select = store, target, key, select
+        self._chunks = None
+        super().__init__()
+
+    def reset(self):
+        self._chunks = None
+
+    def next(self, input_data) -> int:
+        if self._chunks is None:
+            self._chunks = self.store.iter_chunks(self.target, True, self.key)
+        for X, y, timestamps in self._chunks:
+            if self.select is not None:
+                keep = self.select(timestamps).to_numpy()
+                if not keep.any():
+                    continue
+                X, y = X[keep], y[keep]
+            input_data(data=X, label=y)
+            return 1
+        return 0
+
+
+def _fit_chunked(store: FeatureStore, target: str, key: str, select=None) -> XGBRegressor:
+    """
+    Out-of-core equivalent of XGBRegressor(**XGB_PARAMS).fit(X[select], y[select]) on a
+    compact feature store entry; returned as an XGBRegressor like the in-memory path.
+    """
+    params = {k: v for k, v in XGB_PARAMS.items() if k not in ("n_estimators", "n_jobs", "random_state", "enable_categorical")}
+    params.update(nthread=XGB_PARAMS["n_jobs"], seed=XGB_PARAMS["random_state"])
+    data = xgb.QuantileDMatrix(FeatureChunkIter(store, target, key, select), enable_categorical=True)
+    booster = xgb.train(params, data, num_boost_round=XGB_PARAMS["n_estimators"])
+
+    model = XGBRegressor(**XGB_PARAMS)
+    model.load_model(bytearray(booster.save_raw("json")))
+    return model
+
+
+def _train_mask(timestamps: pd.Series) -> pd.Series:
+    return timestamps <= TRAIN_END
+
+
+def _val_mask(timestamps: pd.Series) -> pd.Series:
+    return (timestamps > TRAIN_END) & (timestamps <= VAL_END)
+
+
+def main(compact: bool = False, chunked: bool = False):
     print("\n🚀 STARTING XGBOOST TRAINING PIPELINE")
     pipeline_tracker = EmissionsTracker(
         project_name="xgb_generation_pipeline",
@@ -47,13 +109,16 @@ def main():
         log_level="error"
     )
     pipeline_tracker.start()
-    df_raw = pd.read_csv(DATA_FILE)
+    # Chunked feature building streams fixed-schema (compact) chunks into the store
+    compact = compact or chunked
+    # Raw data is only loaded if some target's features are not in the feature store yet
+    feature_store = FeatureStore()
+    raw_hash = raw_store_fingerprint(RAW_STORE_DIR)
+    feature_keys = {target: feature_store.key(raw_hash, target, FEATURE_SPEC_VERSION, compact) for target in TARGET_COL}
+    pending_features = None
     all_metrics = []
 
     for target in TARGET_COL:
-        if target not in df_raw.columns:
-            continue
-
         print(f"\n➡️ Target: {target}")
         target_tracker = EmissionsTracker(
             project_name=f"xgb_{target.replace(' ', '_')}",
@@ -65,19 +130,67 @@ def main():
         target_tracker.start()
         emissions = 0.0
             
-        X, y, timestamps = build_features_dataframe(df_raw, target_col=target)
+        feature_key = feature_keys[target]
+        model_val = None
+        if chunked:
+            # Training streams the entry's row groups into XGBoost, only the validation month is loaded
+            if feature_store.contains(target, compact, feature_key):
+                print(f"⚡ Features found in store ({feature_key})")
+            else:
+                writer = feature_store.writer(target, compact, feature_key)
+                try:
+                    build_features_chunked(target, writer, RAW_STORE_DIR)
+                except BaseException:
+                    writer.abort()
+                    raise
+                writer.close()
 
             # --- STEP 1: VALIDATION FOR METRICS ---
-        train_mask = timestamps <= TRAIN_END
-        val_mask = (timestamps > TRAIN_END) & (timestamps <= VAL_END)
-            
-        X_train_val, y_train_val = X.loc[train_mask], y.loc[train_mask]
-        X_val, y_val = X.loc[val_mask], y.loc[val_mask]
+            val_chunks = []
+            for X_chunk, y_chunk, ts_chunk in feature_store.iter_chunks(target, compact, feature_key):
+                val_mask = _val_mask(ts_chunk).to_numpy()
+                val_chunks.append((X_chunk[val_mask], y_chunk[val_mask]))
+            X_val = pd.concat([X_chunk for X_chunk, _ in val_chunks])
+            y_val = pd.concat([y_chunk for _, y_chunk in val_chunks])
+            del val_chunks
+            if not X_val.empty:
+                model_val = _fit_chunked(feature_store, target, feature_key, select=_train_mask)
+
+            # --- STEP 2: FULL RETRAIN ON 100% DATA ---
+            print("🔄 Retraining final model on 100% of data (streamed from the feature store)...")
+            final_model = _fit_chunked(feature_store, target, feature_key)
+        else:
+            cached = feature_store.load(target, compact, feature_key)
+            if cached is not None:
+                print(f"⚡ Features loaded from store ({feature_key})")
+                X, y, timestamps = cached
+            else:
+                if pending_features is None:
+                    # First miss: every target missing from the store shares one base pass,
+                    # their matrices are built one at a time, in TARGET_COL order
+                    missing = [t for t in TARGET_COL if not feature_store.contains(t, compact, feature_keys[t])]
+                    pending_features = build_features_multi(read_raw(root=RAW_STORE_DIR), missing, compact=compact)
+                _, X, y, timestamps = next(pending_features)
+                feature_store.save(target, compact, feature_key, X, y, timestamps)
+
+            # --- STEP 1: VALIDATION FOR METRICS ---
+            train_mask = _train_mask(timestamps)
+            val_mask = _val_mask(timestamps)
+
+            X_train_val, y_train_val = X.loc[train_mask], y.loc[train_mask]
+            X_val, y_val = X.loc[val_mask], y.loc[val_mask]
 
-        if not X_val.empty:
+            if not X_val.empty:
                 model_val = XGBRegressor(**XGB_PARAMS)
                 model_val.fit(X_train_val, y_train_val, eval_set=[(X_val, y_val)], verbose=False)
-                
+
+            # --- STEP 2: FULL RETRAIN ON 100% DATA ---
+            # No masks = use all data points from 01.01 to 12.31
+            print(f"🔄 Retraining final model on 100% of data (Samples: {len(X)})...")
+            final_model = XGBRegressor(**XGB_PARAMS)
+            final_model.fit(X, y, verbose=False)
+
+        if model_val is not None:
                 # Calculate Metrics (Global average for this target)
                 preds = model_val.predict(X_val)
                 mae = mean_absolute_error(y_val, preds)
@@ -94,17 +207,14 @@ def main():
                     "Status": "Success"
                 })
 
-            # --- STEP 2: FULL RETRAIN ON 100% DATA ---
-            # No masks = use all data points from 01.01 to 12.31
-        print(f"🔄 Retraining final model on 100% of data (Samples: {len(X)})...")
-        final_model = XGBRegressor(**XGB_PARAMS)
-        final_model.fit(X, y, verbose=False)
-
         # Save Final Model
         model_path = MODEL_DIR / f"xgb_high_cost_{target.replace(' ', '_')}.pkl"
         joblib.dump(final_model, model_path)
         print(f"✅ Saved Final Model: {model_path.name}")
         
+        # Free this target's matrices before the next one is built
+        X = y = timestamps = cached = X_train_val = y_train_val = X_val = y_val = None
+
         # ✅ ALWAYS stop tracker here
         emissions = target_tracker.stop()
         print(f"🌱 Carbon emissions for {target}: {emissions:.4f} kg CO₂eq")
@@ -120,4 +230,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the XGBoost models")
+    parser.add_argument("--compact", action="store_true",
+                        help="float32 features with a categorical country column instead of one-hot float64")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Build features and train out-of-core, one country-year at a time (implies --compact)")
+    args = parser.parse_args()
+
+    main(compact=args.compact, chunked=args.chunked)
\ No newline at end of file
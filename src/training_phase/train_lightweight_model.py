@@ -1,9 +1,14 @@
+import sys
+import time
+import argparse
 import pandas as pd
 import joblib
 from pathlib import Path
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 from sklearn.metrics import mean_absolute_error
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
 from codecarbon import EmissionsTracker
 
 
@@ -12,13 +17,23 @@ warnings.filterwarnings("ignore")
 
 # --- CONFIGURATION ---
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
 PROCESSED_DIR = PROJECT_ROOT / "data" / "02_processed" / "lightweight"
 MODEL_DIR = PROJECT_ROOT / "models" / "lightweight"
 CARBON_DIR = PROJECT_ROOT / "data" / "05_carbon"
 
+from config import SERIES_MATRIX_DIR, RAW_STORE_DIR, TARGET_COLS, HW_BUNDLE_FILE
+from src.storage.series_matrix import SeriesMatrix
+from src.storage.raw_store import read_raw
+from src.storage.hw_artifact import (export_hw_artifact, save_hw_artifact, verify_hw_artifact,
+                                     load_hw_artifacts, update_hw_artifact)
+from src.storage.hw_bundle import write_hw_bundle
+from src.training_phase.feature_spec import serving_window
 
 # We will save the "Proof" here
 METRICS_FILE = MODEL_DIR / "metrics_summary.csv"
+# Fit time, attributed emissions and status of every series of the last run
+FIT_LOG_FILE = MODEL_DIR / "fit_summary.csv"
 
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 CARBON_DIR.mkdir(parents=True, exist_ok=True)
@@ -26,30 +41,100 @@ CARBON_DIR.mkdir(parents=True, exist_ok=True)
 # Training Cutoff for Validation
 # TRAIN_END = "2024-10-31 23:00:00" -> only needed for Model validation (after that, the model is trained with data from the whole year)
 
-def train_lightweight_models():
-    print("🚀 STARTING LIGHTWEIGHT TRAINING & VALIDATION")
-    
-    pipeline_tracker = EmissionsTracker(
-        project_name="holtwinters_lightweight_pipeline",
-        output_dir=str(CARBON_DIR),
-        output_file="hw_pipeline_emissions.csv",
-        log_level="error"
-    )
-    pipeline_tracker.start()
-    
-    files = list(PROCESSED_DIR.glob("processed_*.csv"))
-    if not files:
-        raise FileNotFoundError(f"❌ No data in {PROCESSED_DIR}")
-
-    print(f"   Found {len(files)} datasets.")
-    
-    # List to collect all our proof data
-    metrics_log = []
+def _list_datasets(source: str) -> list:
+    """(country, target_name, ref) per series; ref locates it in the per-series CSVs or the series matrix."""
+    if source == "matrix":
+        return [(entry["country"], entry["target"].replace(" ", "_"), (entry["country"], entry["target"]))
+                for entry in SeriesMatrix(SERIES_MATRIX_DIR)]
 
+    files = list(PROCESSED_DIR.glob("processed_*.csv"))
+    datasets = []
     for file_path in files:
         parts = file_path.stem.split("_")
         country = parts[1]
         target_name = "_".join(parts[2:]) # e.g. "Solar" or "Wind_Onshore"
+        datasets.append((country, target_name, file_path))
+    return datasets
+
+_MATRIX = None  # opened once per process
+
+def _load_series(source: str, ref) -> pd.Series:
+    global _MATRIX
+    if source == "matrix":
+        if _MATRIX is None:
+            _MATRIX = SeriesMatrix(SERIES_MATRIX_DIR)
+        # Zero-copy (read-only) slice of the memory-mapped matrix; the fit gets its own float64 copy
+        return _MATRIX.series(*ref).astype("float64")
+
+    df = pd.read_csv(ref, index_col="datetime_utc", parse_dates=True)
+    return df[df.columns[0]]
+
+def _fit_model(train_data: pd.Series, target_name: str):
+    # --- PARAMETER SELECTION ---
+    if "Solar" in target_name:
+        trend_mode = "add"
+        damped = True
+        seasonal_mode = "add"
+    else:
+        trend_mode = None 
+        damped = False
+        seasonal_mode = "add"
+
+    return ExponentialSmoothing(
+        train_data, 
+        seasonal_periods=24, 
+        trend=trend_mode, 
+        damped_trend=damped,
+        seasonal=seasonal_mode, 
+        initialization_method="estimated"
+    ).fit()
+
+def _train_series(country: str, target_name: str, source: str, ref) -> dict:
+    """Load, fit and save one series. Failures end up in the returned record, never raised."""
+    record = {"Country": country, "Energy_Type": target_name, "Fit_Seconds": None, "Status": "Success"}
+    t0 = time.perf_counter()
+    try:
+        # 1. Load Data
+        # 2. Split Train/Test
+        # train_data = df.loc[:TRAIN_END, target_col]
+        # test_data = df.loc[TRAIN_END:, target_col].iloc[1:]
+        train_data = _load_series(source, ref) # use full data for production phase
+
+        if len(train_data) < 48:
+            record["Status"] = "Skipped (not enough data)"
+            return record
+
+        model = _fit_model(train_data, target_name)
+
+        # 3. Evaluate and Log
+        # if not test_data.empty:
+        #     forecast = model.forecast(len(test_data))
+        #     mae = mean_absolute_error(test_data, forecast)
+            
+        #     # Calculate Capacity/Peak for context
+        #     peak_gen = test_data.max()
+        #     error_pct = (mae / peak_gen * 100) if peak_gen > 0 else 0
+            
+        #     print(f"      ✅ MAE: {mae:.2f} MW  (Approx {error_pct:.1f}%)")
+
+        # 4. Save Model (compact JSON states, not the pickled statsmodels results).
+        # Serving forecasts from the states with NumPy, so they are checked against statsmodels first.
+        artifact = export_hw_artifact(model, country, target_name)
+        verify_hw_artifact(artifact, model.forecast(48).to_numpy())
+        save_hw_artifact(artifact, MODEL_DIR)
+    except Exception as e:
+        record["Status"] = f"Failed: {str(e)}"
+
+    record["Fit_Seconds"] = round(time.perf_counter() - t0, 3)
+    return record
+
+def _init_worker():
+    # One BLAS thread per worker, otherwise N workers x N threads fight over the cores
+    threadpool_limits(1)
+
+def _train_serial(datasets: list, source: str) -> list:
+    records = []
+    for country, target_name, ref in datasets:
         
         tracker = EmissionsTracker(
             project_name="holtwinters_lightweight",
@@ -61,85 +146,86 @@ def train_lightweight_models():
         )
 
         tracker.start()
-        emissions = 0.0
-        
-        # 1. Load Data
-        df = pd.read_csv(file_path, index_col="datetime_utc", parse_dates=True)
-        target_col = df.columns[0]
-        
-        # 2. Split Train/Test
-        # train_data = df.loc[:TRAIN_END, target_col]
-        # test_data = df.loc[TRAIN_END:, target_col].iloc[1:]
-        train_data = df[target_col] # use full data for production phase
-        test_data = pd.Series() # Test data empty, not needed in production phase
+        print(f"\n⚡ Training: {country} - {target_name}")
+        record = _train_series(country, target_name, source, ref)
+        record["Emissions_kg"] = tracker.stop()
 
-        if len(train_data) < 48:
-            print("      ⚠️ Skipped (not enough data)")
-            tracker.stop()
-            continue
+        if record["Status"] == "Success":
+            print(f"      🌱 Carbon emissions: {record['Emissions_kg']:.6f} kg CO₂eq ({record['Fit_Seconds']:.1f}s)")
+        else:
+            print(f"      ⚠️ {record['Status']}")
+        records.append(record)
+    return records
 
-        print(f"\n⚡ Training: {country} - {target_name}")
+def _train_parallel(datasets: list, source: str, workers: int) -> list:
+    """Fits on a process pool; a crashed worker only fails the series it was fitting."""
+    records = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_train_series, country, target_name, source, ref): (country, target_name)
+                   for country, target_name, ref in datasets}
+        for future in as_completed(futures):
+            country, target_name = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {"Country": country, "Energy_Type": target_name, "Fit_Seconds": None,
+                          "Status": f"Failed: worker crashed ({e})"}
 
-        try:
-            # --- PARAMETER SELECTION ---
-            if "Solar" in target_name:
-                trend_mode = "add"
-                damped = True
-                seasonal_mode = "add"
+            if record["Status"] == "Success":
+                print(f"   ✅ {country} - {target_name} ({record['Fit_Seconds']:.1f}s)")
             else:
-                trend_mode = None 
-                damped = False
-                seasonal_mode = "add"
-
-            model = ExponentialSmoothing(
-                train_data, 
-                seasonal_periods=24, 
-                trend=trend_mode, 
-                damped_trend=damped,
-                seasonal=seasonal_mode, 
-                initialization_method="estimated"
-            ).fit()
-            
-            # 3. Evaluate and Log
-            # if not test_data.empty:
-            #     forecast = model.forecast(len(test_data))
-            #     mae = mean_absolute_error(test_data, forecast)
-                
-            #     # Calculate Capacity/Peak for context
-            #     peak_gen = test_data.max()
-            #     error_pct = (mae / peak_gen * 100) if peak_gen > 0 else 0
-                
-            #     print(f"      ✅ MAE: {mae:.2f} MW  (Approx {error_pct:.1f}%)")
-                
-            #     # Add to our log list
-            #     metrics_log.append({
-            #         "Country": country,
-            #         "Energy_Type": target_name,
-            #         "MAE_MW": round(mae, 2),
-            #         "Test_Peak_MW": round(peak_gen, 2),
-            #         "Error_Percentage": round(error_pct, 1),
-            #         "Status": "Success"
-            #     })
-
-            # 4. Save Model
-            model_filename = f"hw_{country}_{target_name}.pkl"
-            joblib.dump(model, MODEL_DIR / model_filename)
-            
-            emissions = tracker.stop()
-            print(f"      🌱 Carbon emissions: {emissions:.6f} kg CO₂eq")
-            
-        except Exception as e:
-            print(f"      ❌ Failed: {e}")
-            metrics_log.append({
-                "Country": country,
-                "Energy_Type": target_name,
-                "MAE_MW": None,
-                "Test_Peak_MW": None,
-                "Error_Percentage": None,
-                "Status": f"Failed: {str(e)}"
-            })
+                print(f"   ⚠️ {country} - {target_name}: {record['Status']}")
+            records.append(record)
+    return records
+
+def train_lightweight_models(source: str = "csv", workers: int = 1):
+    print("🚀 STARTING LIGHTWEIGHT TRAINING & VALIDATION")
+    t0 = time.perf_counter()
+    
+    pipeline_tracker = EmissionsTracker(
+        project_name="holtwinters_lightweight_pipeline",
+        output_dir=str(CARBON_DIR),
+        output_file="hw_pipeline_emissions.csv",
+        log_level="error"
+    )
+    pipeline_tracker.start()
+    
+    datasets = _list_datasets(source)
+    if not datasets:
+        raise FileNotFoundError(f"❌ No data in {PROCESSED_DIR}")
+
+    print(f"   Found {len(datasets)} datasets.")
+
+    if workers > 1:
+        print(f"   Training on {workers} worker processes...")
+        records = _train_parallel(datasets, source, workers)
+    else:
+        records = _train_serial(datasets, source)
+
+    pipeline_emissions = pipeline_tracker.stop()
+
+    if workers > 1:
+        # Trackers running side by side would each measure the whole machine, so the
+        # pipeline total is split across series by their share of the fit time
+        total_fit = sum(r["Fit_Seconds"] or 0.0 for r in records)
+        for r in records:
+            r["Emissions_kg"] = pipeline_emissions * (r["Fit_Seconds"] or 0.0) / total_fit if total_fit else 0.0
 
     # --- SAVE THE PROOF ---
+    fit_df = pd.DataFrame(records).sort_values(by=["Country", "Energy_Type"])
+    fit_df.to_csv(FIT_LOG_FILE, index=False)
+    print(f"\n⏱️  Per-series fit times and emissions exported to: {FIT_LOG_FILE}")
+
+    # List to collect all our proof data
+    metrics_log = [{
+        "Country": r["Country"],
+        "Energy_Type": r["Energy_Type"],
+        "MAE_MW": None,
+        "Test_Peak_MW": None,
+        "Error_Percentage": None,
+        "Status": r["Status"]
+    } for r in records if r["Status"].startswith("Failed")]
+
     if metrics_log:
         metrics_df = pd.DataFrame(metrics_log)
         # Sort by Country for nicer reading
@@ -149,9 +235,137 @@ def train_lightweight_models():
         print(f"\n📄 Validation Metrics exported to: {METRICS_FILE}")
         print("   (You can keep this file as proof of model performance.)")
         
-    pipeline_emissions = pipeline_tracker.stop()
+    if any(r["Status"] == "Success" for r in records):
+        bundle_lightweight_models()
+
     print(f"\n🌍 TOTAL Holt-Winters pipeline emissions: {pipeline_emissions:.6f} kg CO₂eq")
-    print("🎉 LIGHTWEIGHT MODELS READY")
+    print(f"🎉 LIGHTWEIGHT MODELS READY ({time.perf_counter() - t0:.1f}s)")
+
+def convert_pickles(remove: bool = False):
+    """Turn pickled statsmodels results (hw_*.pkl) of earlier runs into JSON artifacts."""
+    pickles = sorted(MODEL_DIR.glob("hw_*.pkl"))
+    if not pickles:
+        raise FileNotFoundError(f"❌ No pickled models in {MODEL_DIR}")
+
+    print(f"🔄 Converting {len(pickles)} pickled models to JSON artifacts...")
+    for path in pickles:
+        parts = path.stem.split("_")
+        country, target_name = parts[1], "_".join(parts[2:])
+        results = joblib.load(path)
+        artifact = export_hw_artifact(results, country, target_name)
+        verify_hw_artifact(artifact, results.forecast(48).to_numpy())
+        artifact_path = save_hw_artifact(artifact, MODEL_DIR)
+        print(f"   ✅ {path.name} ({path.stat().st_size / 1024:,.0f} KB) -> {artifact_path.name} ({artifact_path.stat().st_size / 1024:,.1f} KB)")
+        if remove:
+            path.unlink()
+    bundle_lightweight_models()
+
+def update_lightweight_models(root: Path = MODEL_DIR, raw_root: Path = RAW_STORE_DIR, until=None) -> int:
+    """
+    Fold the raw hours newer than each model's last hour into its states (no refit).
+
+    Only raw rows after the oldest model's last hour and before `until` are read;
+    they are averaged to hours like the preprocessing does and pushed in O(1) per
+    hour, so forecasts continue from the latest observation. `until` defaults to
+    the start of today's serving window (midnight UTC): the HW service can only
+    forecast windows after the models' last hour, and the current, partly ingested
+    hour is never folded in for good. A full retrain is only needed occasionally
+    to re-estimate the smoothing parameters. Returns the number of hours folded in.
+    """
+    artifacts = load_hw_artifacts(root)
+    if not artifacts:
+        raise FileNotFoundError(f"❌ No Holt-Winters artifacts in {root}")
+
+    until = serving_window()[0] if until is None else pd.Timestamp(until)
+    since = min(pd.Timestamp(a["last_timestamp"]) for a in artifacts)
+    df = read_raw(columns=TARGET_COLS, root=raw_root, start=since + pd.Timedelta(hours=1), end=until)
+    hourly = df[TARGET_COLS].groupby([df["Country"], df["datetime_utc"].dt.floor("h")]).mean()
+
+    folded, updated = 0, 0
+    for artifact in artifacts:
+        if artifact["country"] not in hourly.index.get_level_values("Country"):
+            continue
+        count = update_hw_artifact(artifact, hourly.loc[artifact["country"], artifact["target"]])
+        if count:
+            save_hw_artifact(artifact, root)
+            folded += count
+            updated += 1
+
+    print(f"   🔁 Holt-Winters states updated up to {until}: {updated}/{len(artifacts)} models, {folded} new hours folded in")
+    if updated:
+        bundle_lightweight_models(root)
+    return folded
+
+def bundle_lightweight_models(root: Path = MODEL_DIR) -> Path:
+    """Pack every JSON artifact under root into the memory-mapped bundle the HW service reads."""
+    artifacts = load_hw_artifacts(root)
+    path = write_hw_bundle(artifacts, Path(root) / HW_BUNDLE_FILE.name)
+    print(f"   📦 Bundled {len(artifacts)} models into {path.name} ({path.stat().st_size / 1024:,.1f} KB)")
+    return path
+
+def update_serving_check() -> int:
+    """
+    Self-contained check (synthetic data, temp directories) that an update run in
+    the middle of a day leaves that day servable: models fitted on older hours are
+    updated from a raw store filled up to midday, then the HW service's window
+    offsets are computed for that day. Returns the number of models checked;
+    raises AssertionError on a mismatch.
+    """
+    import tempfile
+    from src.benchmarks.synthetic import synthetic_raw_frame
+    from src.storage.hw_artifact import HWStates
+    from src.storage.raw_store import write_partitions
+    from src.production_phase.predict_lightweight import HoltWintersForecaster
+
+    df = synthetic_raw_frame(years=0.05, countries=["AT"], missing_ratio=0.0)
+    midday = df["datetime_utc"].iloc[-1].normalize() - pd.Timedelta(hours=12)
+    day_start = serving_window(str(midday.date()))[0]
+    train_end = day_start - pd.Timedelta(days=3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_root, raw_root = Path(tmp) / "models", Path(tmp) / "raw"
+        write_partitions(df[df["datetime_utc"] <= midday], root=raw_root)
+        series = df.set_index("datetime_utc")
+        for target in ["Solar", "Wind Onshore"]:
+            train_data = series.loc[:train_end - pd.Timedelta(hours=1), target].asfreq("h")
+            artifact = export_hw_artifact(_fit_model(train_data, target), "AT", target)
+            save_hw_artifact(artifact, model_root)
+
+        # Data up to midday is in the store, but only the hours before the day's window may be folded in
+        update_lightweight_models(model_root, raw_root, until=day_start)
+        models = [HWStates.from_artifact(a) for a in load_hw_artifacts(model_root)]
+        last_times = {m.last_time for m in models}
+        if last_times != {day_start - pd.Timedelta(hours=1)}:
+            raise AssertionError(f"Models were updated up to {last_times}, not to the hour before {day_start}")
+        # Raises ValueError if the window starts before a model's last hour
+        offsets = HoltWintersForecaster._offsets(day_start, models)
+        if offsets != [1] * len(models):
+            raise AssertionError(f"Window of {day_start.date()} starts at offsets {offsets}")
+    return len(models)
 
 if __name__ == "__main__":
-    train_lightweight_models()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the Holt-Winters models")
+    parser.add_argument("--source", choices=["csv", "matrix"], default="csv",
+                        help="Read the per-series CSVs or the memory-mapped series matrix")
+    parser.add_argument("--workers", type=int, default=1, help="Processes fitting series in parallel")
+    parser.add_argument("--convert-pickles", action="store_true",
+                        help="Convert existing hw_*.pkl models to JSON artifacts (and delete them) instead of training")
+    parser.add_argument("--update", action="store_true",
+                        help="Only fold new raw hours before today's serving window (midnight UTC) into the trained models' states (no refit)")
+    parser.add_argument("--check-update", action="store_true",
+                        help="Check on synthetic data that a mid-day --update keeps the day servable")
+    parser.add_argument("--bundle", action="store_true",
+                        help="Only rebuild the serving bundle from the existing JSON artifacts")
+    args = parser.parse_args()
+
+    if args.convert_pickles:
+        convert_pickles(remove=True)
+    elif args.update:
+        update_lightweight_models()
+    elif args.check_update:
+        n_models = update_serving_check()
+        print(f"✅ Mid-day update: {n_models} models still serve the day's window")
+    elif args.bundle:
+        bundle_lightweight_models()
+    else:
+        train_lightweight_models(source=args.source, workers=args.workers)
@@ -0,0 +1,181 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Add the project root to the Python path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import RAW_STORE_DIR, VALIDATION_REPORT_FILE, TARGET_COLS, TARGET_COUNTRIES, END_DATE
+from src.storage.raw_store import read_raw, KEY_COLS
+
+# --- QUALITY GATES ---
+# A series fails the gate if any of these limits is exceeded
+GATES = dict(
+    max_missing_ratio=0.05,     # missing hours + NaN values, relative to the expected hourly count
+    max_duplicates=0,           # duplicate (datetime_utc, Country) rows
+    max_negative_ratio=0.01,    # small negatives occur (plant self-consumption), lots of them don't
+    max_implausible=0,          # values above PLAUSIBLE_MAX_MW
+    max_staleness_hours=48,     # hours between the last timestamp and the reference time
+)
+
+# Upper bound for a single country's hourly generation (MW); Germany peaks around 60 GW solar
+PLAUSIBLE_MAX_MW = {"Solar": 100_000, "Wind Onshore": 100_000, "Wind Offshore": 40_000}
+
+EXPECTED_DTYPES = {"datetime_utc": "datetime64[ns, UTC]", "Country": "object", **{t: "float64" for t in TARGET_COLS}}
+
+
+class DataValidationError(ValueError):
+    """Raised when ingested data violates a quality gate; blocks downstream processing."""
+
+
+def _check_schema(df: pd.DataFrame) -> list:
+    """Column presence, dtypes and country codes."""
+    problems = []
+    for col, dtype in EXPECTED_DTYPES.items():
+        if col not in df.columns:
+            problems.append(f"missing column '{col}'")
+        elif str(df[col].dtype) != dtype:
+            problems.append(f"column '{col}' has dtype {df[col].dtype}, expected {dtype}")
+
+    if "Country" in df.columns:
+        unknown = sorted(set(df["Country"].unique()) - set(TARGET_COUNTRIES))
+        if unknown:
+            problems.append(f"unknown country codes: {unknown}")
+    return problems
+
+
+def compute_series_stats(df: pd.DataFrame, reference_time: pd.Timestamp) -> pd.DataFrame:
+    """
+    All per-(country, target) quality metrics in a single vectorized pass:
+    one boolean flag matrix, one groupby-sum, no per-series loops.
+    """
+    values = df[TARGET_COLS].to_numpy(dtype="float64")
+    caps = np.array([PLAUSIBLE_MAX_MW[t] for t in TARGET_COLS])
+
+    flags = {"rows": np.ones(len(df), dtype=np.int64),
+             "duplicates": df.duplicated(subset=KEY_COLS).to_numpy()}
+    for i, target in enumerate(TARGET_COLS):
+        col = values[:, i]
+        flags[f"{target}|nan"] = np.isnan(col)
+        flags[f"{target}|negative"] = col < 0
+        flags[f"{target}|implausible"] = col > caps[i]
+
+    counts = pd.DataFrame(flags).groupby(df["Country"].to_numpy()).sum()
+    span = df.groupby("Country")["datetime_utc"].agg(["min", "max", "nunique"])
+
+    expected_hours = (span["max"] - span["min"]) / pd.Timedelta(hours=1) + 1
+    missing_hours = expected_hours - span["nunique"]
+    staleness = (reference_time - span["max"]) / pd.Timedelta(hours=1)
+
+    rows = []
+    for target in TARGET_COLS:
+        nan = counts[f"{target}|nan"]
+        valid = counts["rows"] - nan
+        rows.append(pd.DataFrame({
+            "country": counts.index,
+            "target": target,
+            "rows": counts["rows"].to_numpy(),
+            "first": span["min"].astype(str).to_numpy(),
+            "last": span["max"].astype(str).to_numpy(),
+            "missing_ratio": ((missing_hours + nan) / expected_hours).round(4).to_numpy(),
+            "duplicates": counts["duplicates"].to_numpy(),
+            "negative_ratio": (counts[f"{target}|negative"] / valid.clip(lower=1)).round(4).to_numpy(),
+            "implausible": counts[f"{target}|implausible"].to_numpy(),
+            "staleness_hours": staleness.round(1).to_numpy(),
+            "available": (valid > 0).to_numpy(),
+        }))
+
+    return pd.concat(rows, ignore_index=True).sort_values(["country", "target"], ignore_index=True)
+
+
+def _gate_violations(stats: pd.DataFrame) -> pd.DataFrame:
+    """Evaluate every gate on every available series at once; returns one row per violation."""
+    checks = {
+        "missing_ratio": stats["missing_ratio"] > GATES["max_missing_ratio"],
+        "duplicates": stats["duplicates"] > GATES["max_duplicates"],
+        "negative_ratio": stats["negative_ratio"] > GATES["max_negative_ratio"],
+        "implausible": stats["implausible"] > GATES["max_implausible"],
+        "staleness_hours": stats["staleness_hours"] > GATES["max_staleness_hours"],
+    }
+    # Series that don't exist for a country (e.g. offshore wind in AT) are reported, not gated
+    failed = pd.DataFrame(checks)[stats["available"]].stack()
+    failed = failed[failed]
+
+    rows = failed.index.get_level_values(0)
+    gates = failed.index.get_level_values(1)
+    return pd.DataFrame({
+        "country": stats.loc[rows, "country"].to_numpy(),
+        "target": stats.loc[rows, "target"].to_numpy(),
+        "gate": gates,
+        "value": [float(stats.at[row, gate]) for row, gate in zip(rows, gates)],
+    })
+
+
+def validate_raw_store(root: Path = RAW_STORE_DIR, reference_time=None, countries: list | None = None,
+                       report_file: Path = VALIDATION_REPORT_FILE, fail: bool = True) -> dict:
+    """
+    Validate the raw store, write a JSON report and (by default) raise
+    DataValidationError if any gate is violated.
+    reference_time is the timestamp the data is expected to reach (staleness check);
+    it defaults to now.
+    """
+    t0 = time.perf_counter()
+    reference_time = pd.Timestamp.now(tz="UTC") if reference_time is None else pd.Timestamp(reference_time)
+    if reference_time.tzinfo is None:
+        reference_time = reference_time.tz_localize("UTC")
+
+    print(f"🔎 Validating raw store at {root}...")
+    df = read_raw(countries=countries, root=root)
+
+    schema_problems = _check_schema(df)
+    stats = compute_series_stats(df, reference_time)
+    violations = _gate_violations(stats)
+    passed = not schema_problems and violations.empty
+    elapsed = time.perf_counter() - t0
+
+    report = {
+        "generated_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "reference_time": reference_time.isoformat(),
+        "passed": passed,
+        "rows_checked": int(len(df)),
+        "seconds": round(elapsed, 3),
+        "gates": GATES,
+        "schema_problems": schema_problems,
+        "violations": violations.to_dict(orient="records"),
+        "series": stats.to_dict(orient="records"),
+    }
+
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print(f"   Checked {len(df):,} rows / {int(stats['available'].sum())} series in {elapsed:.2f}s")
+    print(f"   📄 Report: {report_file}")
+
+    if passed:
+        print("   ✅ All quality gates passed")
+        return report
+
+    for problem in schema_problems:
+        print(f"   ❌ Schema: {problem}")
+    for v in report["violations"]:
+        print(f"   ❌ {v['country']} {v['target']}: {v['gate']} = {v['value']}")
+
+    if fail:
+        raise DataValidationError(
+            f"{len(schema_problems)} schema problems and {len(violations)} gate violations (see {report_file})"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate the raw generation data store")
+    parser.add_argument("--as-of", default=END_DATE, help="Timestamp the data should reach (staleness check)")
+    args = parser.parse_args()
+
+    validate_raw_store(reference_time=args.as_of)